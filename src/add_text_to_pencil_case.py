@@ -2,27 +2,16 @@ import trimesh
 from trimesh.creation import box
 from solid import text, linear_extrude, scad_render
 import os
-import subprocess
+from openscad_utils import render_scad
 import numpy as np
+from mesh_deformers import deform, curve_onto_cylinder
 from solid.utils import translate
 
 
 def curve_mesh_onto_cylinder(mesh, radius):
-    
-    for vertex in mesh.vertices:
-        # Get the original x, y, z coordinates
-        x, y, z = vertex
-
-        # Convert x (linear distance) to an angular displacement around the cylinder
-        angle = x / radius
-
-        # Map the flat vertex onto the curved surface
-        new_z = radius * np.cos(angle) + z*0.5
-
-        # Set the new vertex position
-        vertex[2] = new_z
-    
-    return mesh
+    # Convert x (linear distance) to an angular displacement around the cylinder
+    # and map the flat vertices onto the curved surface
+    return deform(mesh, curve_onto_cylinder, radius=radius, axis=0)
 
 
 def multi_line_text(text_lines, line_spacing=10, size=10, height=5):
@@ -53,19 +42,8 @@ text_geom = text_3d(text_string, font_size, text_height)
 # Render the text geometry to an OpenSCAD string
 scad_code = scad_render(text_geom)
 
-# Path for the OpenSCAD file
-scad_path = os.path.join(output_dir, 'text.scad')
-
-# Write the OpenSCAD string to a file
-with open(scad_path, 'w') as f:
-    f.write(scad_code)
-
-# Convert the OpenSCAD file to STL using OpenSCAD command line
-stl_path_text = os.path.join(output_dir, 'text.stl')
-subprocess.run(['openscad', '-o', stl_path_text, scad_path])
-
-# Load the text geometry from the generated STL file
-text_mesh = trimesh.load_mesh(stl_path_text)
+# Convert it to a mesh in a private temporary directory
+text_mesh = render_scad(scad_code)
 
 #text_mesh.show()
 
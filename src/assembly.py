@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+import trimesh
+
+
+# An assembly is one mesh placed many times: the mesh is stored once with an
+# (N, 4, 4) array of transforms, instead of N transformed copies. It expands
+# to world coordinates only when a single mesh is needed, in one batched
+# matrix product, and glTF files keep the instancing:
+#
+#     links = Assembly(link, transforms)
+#     links.export("~/Downloads/chain.glb")   # one mesh, N nodes
+#     chain = links.to_mesh()                 # N copies, concatenated
+
+
+def translations(offsets):
+    # (N, 3) offsets to (N, 4, 4) translation matrices
+    offsets = np.asarray(offsets, dtype=np.float64).reshape(-1, 3)
+    transforms = np.tile(np.eye(4), (len(offsets), 1, 1))
+    transforms[:, :3, 3] = offsets
+    return transforms
+
+
+class Assembly:
+    """
+    Instances of one mesh.
+
+    Parameters:
+    - mesh: The part, shared by every instance and never modified.
+    - transforms: (N, 4, 4) array of instance transforms, a single identity
+      if None.
+    - name: Name of the geometry in exported scenes.
+    """
+
+    def __init__(self, mesh, transforms=None, name="part"):
+        self.mesh = mesh
+        if transforms is None:
+            transforms = np.eye(4)
+        self.transforms = np.asarray(transforms, dtype=np.float64).reshape(-1, 4, 4)
+        self.name = name
+
+    @classmethod
+    def from_translations(cls, mesh, offsets, name="part"):
+        return cls(mesh, translations(offsets), name)
+
+    def __len__(self):
+        return len(self.transforms)
+
+    def transformed(self, matrix):
+        # The whole assembly moved by matrix, still without copying the mesh
+        return Assembly(self.mesh, np.asarray(matrix) @ self.transforms, self.name)
+
+    def concatenated(self, other):
+        # Instances of both assemblies, which must share their mesh
+        if other.mesh is not self.mesh:
+            raise ValueError("Only assemblies of the same mesh can be concatenated")
+        return Assembly(self.mesh, np.concatenate((self.transforms, other.transforms)), self.name)
+
+    @property
+    def bounds(self):
+        # From the transformed corners of the mesh bounds, without expanding the vertices
+        corners = trimesh.bounds.corners(self.mesh.bounds)
+        points = np.einsum("nij,cj->nci", self.transforms[:, :3, :3], corners) + self.transforms[:, None, :3, 3]
+        points = points.reshape(-1, 3)
+        return np.array([points.min(axis=0), points.max(axis=0)])
+
+    def vertices(self, start=0, stop=None):
+        """
+        World coordinates of the vertices of instances start to stop, as an
+        (n, V, 3) array, in one batched product.
+        """
+        transforms = self.transforms[start:stop]
+        return np.einsum("nij,vj->nvi", transforms[:, :3, :3], self.mesh.vertices) + transforms[:, None, :3, 3]
+
+    def _faces(self, start=0, stop=None):
+        # Faces of every instance, offset into the expanded vertices; mirrored instances are flipped
+        transforms = self.transforms[start:stop]
+        faces = np.asarray(self.mesh.faces)
+        offsets = np.arange(len(transforms))[:, None, None] * len(self.mesh.vertices)
+        faces = np.broadcast_to(faces, (len(transforms),) + faces.shape) + offsets
+        mirrored = np.linalg.det(transforms[:, :3, :3]) < 0
+        faces[mirrored] = faces[mirrored][..., ::-1]
+        return faces
+
+    def to_mesh(self):
+        """
+        Expand to a single mesh with every instance in world coordinates.
+        """
+        vertices = self.vertices().reshape(-1, 3)
+        faces = self._faces().reshape(-1, 3)
+        return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+    def instances(self):
+        # One transformed copy per instance, for the operations that need separate meshes
+        for i in range(len(self)):
+            yield trimesh.Trimesh(vertices=self.vertices(i, i + 1)[0], faces=self.mesh.faces, process=False)
+
+    def triangles(self, batch_instances=4096):
+        """
+        Yield the world-space triangles in batches of (n, 3, 3) arrays, e.g.
+        for StreamingSTLWriter.write_triangles.
+        """
+        faces = np.asarray(self.mesh.faces)
+        for start in range(0, len(self), batch_instances):
+            vertices = self.vertices(start, start + batch_instances)
+            triangles = vertices[:, faces]
+            mirrored = np.linalg.det(self.transforms[start:start + batch_instances, :3, :3]) < 0
+            triangles[mirrored] = triangles[mirrored][:, :, ::-1]
+            yield triangles.reshape(-1, 3, 3)
+
+    def to_scene(self):
+        return to_scene(self)
+
+    def export(self, file_obj, **kwargs):
+        """
+        Export to a file. glTF keeps one copy of the mesh with a node per
+        instance; other formats get the expanded mesh.
+        """
+        extension = os.path.splitext(str(file_obj))[1].lower().lstrip(".")
+        if extension in ("glb", "gltf"):
+            return self.to_scene().export(os.path.expanduser(file_obj), **kwargs)
+        return self.to_mesh().export(file_obj, **kwargs)
+
+
+def to_scene(*assemblies):
+    """
+    Build a trimesh.Scene with every mesh added once and one node per
+    instance, ready for glTF export.
+    """
+    scene = trimesh.Scene()
+    for index, assembly in enumerate(assemblies):
+        geometry = f"{assembly.name}_{index}" if len(assemblies) > 1 else assembly.name
+        scene.add_geometry(assembly.mesh, geom_name=geometry, node_name=f"{geometry}_0", transform=assembly.transforms[0])
+        for i, transform in enumerate(assembly.transforms[1:], 1):
+            # Further nodes reference the same geometry
+            scene.graph.update(frame_to=f"{geometry}_{i}", frame_from=scene.graph.base_frame, matrix=transform, geometry=geometry)
+    return scene
@@ -6,6 +6,8 @@ import matplotlib.pyplot as plt
 from matplotlib import font_manager
 from trimesh.creation import extrude_polygon
 
+from mesh_deformers import subdivide_for_deformer
+
 
 def validate_and_repair_mesh(mesh):
     """
@@ -87,7 +89,7 @@ def create_text_mesh(text, font_size=1.0, depth=0.2):
 
 
 
-def map_text_onto_barrel(text_mesh, barrel_radius, barrel_start, barrel_end):
+def map_text_onto_barrel(text_mesh, barrel_radius, barrel_start, barrel_end, tolerance=0.005):
     # Flatten the text mesh onto the XZ-plane (text reads along X-axis)
     text_mesh.apply_translation(-text_mesh.centroid)
     
@@ -100,27 +102,26 @@ def map_text_onto_barrel(text_mesh, barrel_radius, barrel_start, barrel_end):
     # Move text to the desired position along the bat
     text_mesh.apply_translation([barrel_start + barrel_length / 2, 0, 0])
     
-    # Map text onto barrel surface
-    vertices = text_mesh.vertices
-    x = vertices[:, 0]  # Along the bat's length
-    y = vertices[:, 1]  # Across the text (height of letters)
-    z = vertices[:, 2]  # Depth of the text (extrusion)
-    
     # Adjust angular range (e.g., mapping over 90 degrees)
     angular_range = np.radians(90)  # Adjust angular range as needed
+    text_width = text_mesh.extents[1]
 
-    # Map y-coordinate onto angle around the barrel
-    theta = -(y / text_mesh.extents[1]) * angular_range + angular_range / 2
+    def barrel_map(vertices):
+        x = vertices[:, 0]  # Along the bat's length
+        y = vertices[:, 1]  # Across the text (height of letters)
 
-    # New coordinates on barrel surface
-    new_x = x
-    new_y = barrel_radius * np.cos(theta)
-    new_z = barrel_radius * np.sin(theta)
-    
-    # Update vertices
-    text_mesh.vertices = np.column_stack((new_x, new_y, new_z))
-    
-    return text_mesh
+        # Map y-coordinate onto angle around the barrel
+        theta = -(y / text_width) * angular_range + angular_range / 2
+
+        # New coordinates on barrel surface
+        new_x = x
+        new_y = barrel_radius * np.cos(theta)
+        new_z = barrel_radius * np.sin(theta)
+        return np.column_stack((new_x, new_y, new_z))
+
+    # Split the long letter edges where they would cut across the barrel,
+    # then map the text onto the barrel surface
+    return subdivide_for_deformer(text_mesh, barrel_map, tolerance)
 
 
 def add_text_to_bat(bat, text, barrel_radius, barrel_length_start, barrel_length_end):
@@ -1,6 +1,9 @@
 import trimesh
 import numpy as np
 from threaded_cylinder import create_threaded_cylinder
+from part_cache import cached_part, print_part_stats
+import csg
+import sketch
 from shapely.geometry import Polygon
 
 
@@ -62,22 +65,13 @@ def yz_mirror(mesh):
     return mesh
 
 def build_pan():
-    pan_base = trimesh.creation.box([pan_size, pan_size, pan_thickness])
-    
-    pan_wall1 = trimesh.creation.box([pan_size - 2 * pan_wallthickness, pan_wallthickness, pan_wallheight])
-    pan_wall1 = pan_wall1.apply_translation([0, (pan_size - pan_wallthickness) / 2 * (-1), pan_wallheight/2 + pan_thickness/2])
+    # The base and the wall ring around its edge, each extruded from a 2D outline
+    pan_outline = sketch.rectangle(pan_size, pan_size)
+    pan_base = sketch.extrude(pan_outline, pan_thickness, z=-pan_thickness/2)
+    wall_ring = sketch.difference(pan_outline, sketch.offset(pan_outline, -pan_wallthickness, join="mitre"))
+    pan_walls = sketch.extrude(wall_ring, pan_wallheight, z=pan_thickness/2)
 
-    pan_wall2 = trimesh.creation.box([pan_size - 2 * pan_wallthickness, pan_wallthickness, pan_wallheight])
-    pan_wall2 = pan_wall2.apply_translation([0, (pan_size - pan_wallthickness) / 2, pan_wallheight/2 + pan_thickness/2])
-
-    pan_wall3 = trimesh.creation.box([pan_wallthickness, pan_size, pan_wallheight])
-    pan_wall3 = pan_wall3.apply_translation([(pan_size - pan_wallthickness) / 2 * (-1), 0, pan_wallheight/2 + pan_thickness/2])
-
-    pan_wall4 = trimesh.creation.box([pan_wallthickness, pan_size, pan_wallheight])
-    pan_wall4 = pan_wall4.apply_translation([(pan_size - pan_wallthickness) / 2, 0, pan_wallheight/2 + pan_thickness/2])
-
-
-    pan = trimesh.boolean.union([pan_base, pan_wall1, pan_wall2, pan_wall3, pan_wall4])
+    pan = trimesh.boolean.union([pan_base, pan_walls])
     pan = pan.apply_translation([support_thickness + pan_size / 2 + hole_width,0,pan_thickness/2+support_thickness])
     return pan
 
@@ -97,6 +91,9 @@ def create_hexgon_prism(radius=1.0, height=2.0):
     hexagon_prism = trimesh.creation.extrude_polygon(hexagon, height)    
     return hexagon_prism
 
+# The bolts and their cutouts repeat; create_bolt builds each distinct size
+# once and returns copies of it
+@cached_part
 def create_bolt(height, cap_thickness, cutout_adj=0):
     thread = create_threaded_cylinder(bolt_radius+cutout_adj, height, thread_thickness, thread_pitch)
     cap = create_hexgon_prism(nut_radius, cap_thickness)
@@ -183,30 +180,18 @@ bolt2_cutout6 = bolt2_cutout6.apply_translation([support_thickness/2 + support_t
 # support2 = trimesh.boolean.union([support, support_mirror, pan, bolt1_cutout, bolt1_cutout2, bolt2_cutout, bolt2_cutout2, bolt2_cutout3, bolt2_cutout4, bolt2_cutout5, bolt2_cutout6])
 # support2.show()
 
-support = support.difference(bolt1_cutout)
-support = support.difference(bolt1_cutout2)
-support = support.difference(bolt2_cutout2)
-support = support.difference(bolt2_cutout3)
-support = support.difference(bolt2_cutout5)
-
-
-support_mirror = support_mirror.difference(bolt1_cutout)
-support_mirror = support_mirror.difference(bolt1_cutout2)
-support_mirror = support_mirror.difference(bolt2_cutout)
-support_mirror = support_mirror.difference(bolt2_cutout4)
-support_mirror = support_mirror.difference(bolt2_cutout6)
-
-pan = pan.difference(bolt2_cutout)
-pan = pan.difference(bolt2_cutout2)
-pan = pan.difference(bolt2_cutout3)
-pan = pan.difference(bolt2_cutout4)
-pan = pan.difference(bolt2_cutout5)
-pan = pan.difference(bolt2_cutout6)
+# The bolt holes are cut lazily: each part is one difference with all of its
+# cutouts, evaluated when it is exported
+support = csg.leaf(support, "support") - [bolt1_cutout, bolt1_cutout2, bolt2_cutout2, bolt2_cutout3, bolt2_cutout5]
+support_mirror = csg.leaf(support_mirror, "support_mirror") - [bolt1_cutout, bolt1_cutout2, bolt2_cutout, bolt2_cutout4, bolt2_cutout6]
+pan = csg.leaf(pan, "pan") - [bolt2_cutout, bolt2_cutout2, bolt2_cutout3, bolt2_cutout4, bolt2_cutout5, bolt2_cutout6]
 
 support.export("~/Downloads/bedside_table_support.stl")
 support_mirror.export("~/Downloads/bedside_table_support_mirror.stl")
 pan.export("~/Downloads/bedside_table_pan.stl")
 
+print_part_stats()
+
 
 # support_assemble = trimesh.boolean.union([support, support_mirror, pan])
 # support_assemble.show()
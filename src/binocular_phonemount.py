@@ -16,7 +16,7 @@ def create_iphone13_camera_piece(depth=2):
     base_length = inch_to_mm(1.25)
     base_radius = inch_to_mm(1.5/2)
     # base_square = trimesh.creation.box([base_length, base_length, depth])
-    # base_cylinder = trimesh.creation.cylinder(radius=base_radius, height=depth, sections=64*64)
+    # base_cylinder = trimesh.creation.cylinder(radius=base_radius, height=depth)
     # base_piece = trimesh.boolean.intersection([base_square, base_cylinder])
 
     base_piece = create_rounded_rectangle(base_length, base_length, base_length/4, depth)
@@ -1,14 +1,16 @@
 import trimesh
 import numpy as np
 import utils
+import tessellation
+from assembly import Assembly
 
 # Function to create a chain link as per your description
 def create_custom_chain_link(
     major_radius=1.0,
     minor_radius=0.3,
     elongation=0.2,
-    tube_sections=32,
-    cylinder_sections=32
+    tube_sections=None,
+    cylinder_sections=None
 ):
     """
     Creates a chain link by cutting a torus in half, separating the halves,
@@ -18,15 +20,20 @@ def create_custom_chain_link(
     - major_radius: Major radius of the torus.
     - minor_radius: Minor radius (tube radius) of the torus.
     - elongation: The amount by which to separate the two halves.
-    - sections: Number of sections around the main ring of the torus.
     - tube_sections: Number of sections around the tube of the torus.
     - cylinder_sections: Number of sections around the connecting cylinders.
+    Section counts of None follow the tessellation tolerance.
     """
     # Create the torus
+    if tube_sections is None:
+        tube_sections = tessellation.segments_for_radius(minor_radius)
+    if cylinder_sections is None:
+        cylinder_sections = tessellation.segments_for_radius(minor_radius)
     torus = trimesh.creation.torus(
         major_radius=major_radius,
         minor_radius=minor_radius,
-        tube_sections=tube_sections
+        major_sections=tessellation.segments_for_radius(major_radius + minor_radius),
+        minor_sections=tube_sections
     )
 
     # Slice the torus along the plane
@@ -92,38 +99,26 @@ def create_custom_chain_link(
     return link
 
 
-def chain_from_links(link, num_links, link_elongation, link_shift):
-    # Calculate the length of the link along the Z-axis
-    # Since the torus lies primarily in the XY-plane, we'll consider the dimensions accordingly
-    link_bounds = link.bounds
-    link_size = link_bounds[1] - link_bounds[0]
-    link_length_z = link_size[2]  # Length along Z-axis
-
-    # List to hold the chain links
-    links = []
-
+def chain_assembly(link, num_links, link_elongation, link_shift):
+    """
+    Place num_links instances of one link along the X-axis, every other one
+    rotated by 90 degrees around the X-axis to interlock them. The link mesh
+    is stored once with a transform per instance.
+    """
+    rotation = trimesh.transformations.rotation_matrix(np.pi / 2, [1, 0, 0])
+    transforms = []
     for i in range(num_links):
-        # Copy the link to create a new instance
-        new_link = link.copy()
-
-        # Rotate every other link by 90 degrees around the X-axis to interlock them
-        if i % 2 == 1:
-            rotation = trimesh.transformations.rotation_matrix(np.pi / 2, [1, 0, 0])
-            new_link.apply_transform(rotation)
-            # new_link.show()
-
-        # Translate the link along the Z-axis
         translation_distance = i * (link_elongation + link_shift)
-        # translation = trimesh.transformations.translation_matrix([0, 0, translation_distance])
-        new_link = new_link.apply_translation([translation_distance, 0, 0])
+        transform = trimesh.transformations.translation_matrix([translation_distance, 0, 0])
+        if i % 2 == 1:
+            transform = transform @ rotation
+        transforms.append(transform)
+    return Assembly(link, transforms, name="link")
 
-        # Add the transformed link to the list
-        links.append(new_link)
 
+def chain_from_links(link, num_links, link_elongation, link_shift):
     # Combine all links into a single mesh
-    chain = trimesh.util.concatenate(links)
-
-    return chain
+    return chain_assembly(link, num_links, link_elongation, link_shift).to_mesh()
 
 
 if __name__ == "__main__":
@@ -133,24 +128,23 @@ if __name__ == "__main__":
     major_radius = 1.0 * base_radius   # Major radius of the torus
     minor_radius = 0.5 * base_radius   # Minor radius (thickness of the link)
     elongation = 3 * base_radius     # Gap between the two halves
-    tube_sections = 32    # Smoothness of the torus tube
-    cylinder_sections = 32  # Smoothness of the cylinders
+    tessellation.set_tessellation("final")  # Smoothness of the torus and cylinders
 
     # Create the initial chain link
     link = create_custom_chain_link(
         major_radius=major_radius,
         minor_radius=minor_radius,
-        elongation=elongation,
-        tube_sections=tube_sections,
-        cylinder_sections=cylinder_sections
+        elongation=elongation
     )
 
     # Now, assemble multiple links into a chain
     num_links = 10     # Number of links in the chain
     link_shift = (major_radius) / 2
 
-    chain = chain_from_links(link, num_links, elongation, link_shift)
+    chain = chain_assembly(link, num_links, elongation, link_shift)
     # Visualize the chain
-    # chain.show()
+    # chain.to_scene().show()
     chain.export("~/Downloads/chain.stl")
+    # glTF keeps a single link mesh with a node per link
+    chain.export("~/Downloads/chain.glb")
 
@@ -0,0 +1,463 @@
+import hashlib
+import time
+
+import numpy as np
+import trimesh
+
+from utils import batch_difference, batch_union
+
+
+# Lazy CSG trees: booleans are recorded instead of run, and the whole tree is
+# evaluated once when it is exported. Before that, cutters whose bounding box
+# misses their target are dropped, nested unions and differences that are not
+# shared are merged into n-ary ones and identical subtrees are evaluated only
+# once.
+#
+#     plate = csg.leaf(board) | pocket | connector
+#     plate = plate - [hole.translate(p) for p in positions]
+#     print(plate.explain())
+#     plate.export("~/Downloads/plate.stl")
+
+
+def _node(value):
+    # Meshes can be mixed freely with nodes
+    if isinstance(value, Node):
+        return value
+    if isinstance(value, trimesh.Trimesh):
+        return Leaf(value)
+    raise TypeError(f"Expected a trimesh.Trimesh or a csg node, got {type(value).__name__}")
+
+
+def _nodes(values):
+    if isinstance(values, (Node, trimesh.Trimesh)):
+        return [_node(values)]
+    return [_node(value) for value in values]
+
+
+def _bounds_overlap(bounds_a, bounds_b):
+    if bounds_a is None or bounds_b is None:
+        return False
+    return bool(np.all(bounds_a[0] <= bounds_b[1]) and np.all(bounds_b[0] <= bounds_a[1]))
+
+
+def _empty_mesh():
+    return trimesh.Trimesh(vertices=np.zeros((0, 3)), faces=np.zeros((0, 3), dtype=np.int64))
+
+
+class Node:
+    """
+    Base of all CSG nodes.
+
+    Every node has conservative bounds (None when it is known to be empty),
+    an estimated face count and a structural key: two subtrees with equal
+    keys describe the same solid and are evaluated once.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._bounds = False
+
+    # Building trees
+
+    def union(self, *others):
+        return Union(self, *[node for other in others for node in _nodes(other)])
+
+    def difference(self, *cutters):
+        return Difference(self, *[node for cutter in cutters for node in _nodes(cutter)])
+
+    def intersection(self, *others):
+        return Intersection(self, *[node for other in others for node in _nodes(other)])
+
+    def transform(self, matrix):
+        return Transform(self, matrix)
+
+    def translate(self, offset):
+        return Transform(self, trimesh.transformations.translation_matrix(offset))
+
+    def rotate(self, angle, direction, point=None):
+        return Transform(self, trimesh.transformations.rotation_matrix(angle, direction, point))
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    # mesh | node, mesh - node and mesh & node
+    def __ror__(self, other):
+        return _node(other).union(self)
+
+    def __rsub__(self, other):
+        return _node(other).difference(self)
+
+    def __rand__(self, other):
+        return _node(other).intersection(self)
+
+    # Analysis
+
+    @property
+    def key(self):
+        if self._key is None:
+            self._key = hashlib.sha256(repr(self._key_parts()).encode("utf-8")).hexdigest()
+        return self._key
+
+    @property
+    def bounds(self):
+        if self._bounds is False:
+            self._bounds = self._compute_bounds()
+        return self._bounds
+
+    def plan(self):
+        """
+        Operations in evaluation order, each subtree once.
+
+        Returns:
+        - List of dicts with "op", "key", "operands" (keys), "faces" (the
+          estimated output), "cost" (estimated faces going into a boolean,
+          0 for other steps), "boolean" and, for differences, "pruned".
+        """
+        steps, seen = [], set()
+        self._plan(steps, seen, self._parents())
+        return steps
+
+    def explain(self):
+        """
+        Readable plan: one line per step with its estimated cost, the cutters
+        dropped by the bounding-box test and the subtrees shared between
+        branches.
+        """
+        steps = self.plan()
+        uses = {}
+        for step in steps:
+            for operand in step["operands"]:
+                uses[operand] = uses.get(operand, 0) + 1
+
+        lines = []
+        for number, step in enumerate(steps, 1):
+            line = f"{number:3d}. {step['op']:<12} {step['key'][:8]}  ~{step['faces']} faces"
+            if step["operands"]:
+                line += "  <- " + ", ".join(operand[:8] for operand in step["operands"])
+            if step["boolean"]:
+                line += f"  [boolean, ~{step['cost']} faces in]"
+            if step.get("pruned"):
+                line += f"  [{step['pruned']} {'cutter' if step['pruned'] == 1 else 'cutters'} pruned]"
+            if uses.get(step["key"], 0) > 1:
+                line += f"  [shared by {uses[step['key']]}]"
+            lines.append(line)
+
+        booleans = sum(step["boolean"] for step in steps)
+        cost = sum(step["cost"] for step in steps)
+        lines.append(f"{booleans} booleans, ~{cost} faces through the boolean engine")
+        return "\n".join(lines)
+
+    # Evaluation
+
+    def evaluate(self, engine=None, verbose=False):
+        """
+        Run the planned operations and return the resulting mesh.
+
+        Parameters:
+        - engine: Boolean engine, the trimesh default if None.
+        - verbose: Print every boolean step with its time.
+        """
+        start = time.time()
+        mesh = self._evaluate({}, self._parents(), engine, verbose)
+        if verbose:
+            print(f"evaluated in {time.time() - start:.2f} s")
+        # Results may be shared with leaves or the memo, so hand out a copy
+        return mesh.copy()
+
+    def to_mesh(self, engine=None):
+        return self.evaluate(engine)
+
+    def export(self, file_obj, engine=None, verbose=False, **kwargs):
+        # Evaluate the tree and export the result, like trimesh.Trimesh.export
+        return self.evaluate(engine, verbose).export(file_obj, **kwargs)
+
+    def _parents(self):
+        # Number of distinct parents of every subtree, which decides what may be merged
+        parents, seen, stack = {}, set(), [self]
+        while stack:
+            node = stack.pop()
+            if node.key in seen:
+                continue
+            seen.add(node.key)
+            for child in {child.key: child for child in node._children()}.values():
+                parents[child.key] = parents.get(child.key, 0) + 1
+                stack.append(child)
+        return parents
+
+    def _evaluate(self, memo, parents, engine, verbose):
+        mesh = memo.get(self.key)
+        if mesh is None:
+            mesh = self._compute(self._operands(parents), memo, parents, engine, verbose)
+            memo[self.key] = mesh
+        return mesh
+
+    def _plan(self, steps, seen, parents):
+        if self.key in seen:
+            return
+        operands = self._operands(parents)
+        for operand in operands:
+            operand._plan(steps, seen, parents)
+        seen.add(self.key)
+        steps.append(self._step(operands))
+
+    def _children(self):
+        return []
+
+    def _operands(self, parents):
+        # Operands once nested nodes with no other parent are merged in
+        return self._children()
+
+    def _step(self, operands):
+        return {"op": type(self).__name__.lower(), "key": self.key,
+                "operands": [operand.key for operand in operands],
+                "faces": self.faces, "cost": 0, "boolean": False}
+
+
+class Leaf(Node):
+    # A finished mesh; it is never modified
+    def __init__(self, mesh, name=None):
+        super().__init__()
+        self.mesh = mesh
+        self.name = name
+
+    @property
+    def faces(self):
+        return len(self.mesh.faces)
+
+    def _key_parts(self):
+        vertices = np.ascontiguousarray(self.mesh.vertices, dtype=np.float64)
+        faces = np.ascontiguousarray(self.mesh.faces, dtype=np.int64)
+        return ("leaf", hashlib.sha256(vertices.tobytes() + faces.tobytes()).hexdigest())
+
+    def _compute_bounds(self):
+        return None if len(self.mesh.faces) == 0 else np.array(self.mesh.bounds)
+
+    def _compute(self, operands, memo, parents, engine, verbose):
+        return self.mesh
+
+    def _step(self, operands):
+        step = super()._step(operands)
+        if self.name:
+            step["op"] = f"leaf {self.name}"
+        return step
+
+
+def leaf(mesh, name=None):
+    return Leaf(mesh, name)
+
+
+class Transform(Node):
+    def __init__(self, child, matrix):
+        super().__init__()
+        child = _node(child)
+        matrix = np.asarray(matrix, dtype=np.float64)
+        # Consecutive transforms collapse into one
+        if isinstance(child, Transform):
+            matrix = matrix @ child.matrix
+            child = child.child
+        self.child = child
+        self.matrix = matrix
+
+    @property
+    def faces(self):
+        return self.child.faces
+
+    def _key_parts(self):
+        return ("transform", np.round(self.matrix, 9).tobytes().hex(), self.child.key)
+
+    def _compute_bounds(self):
+        bounds = self.child.bounds
+        if bounds is None:
+            return None
+        corners = trimesh.bounds.corners(bounds)
+        corners = trimesh.transform_points(corners, self.matrix)
+        return np.array([corners.min(axis=0), corners.max(axis=0)])
+
+    def _children(self):
+        return [self.child]
+
+    def _compute(self, operands, memo, parents, engine, verbose):
+        mesh = self.child._evaluate(memo, parents, engine, verbose).copy()
+        mesh.apply_transform(self.matrix)
+        return mesh
+
+
+def _merged(node_type, children, parents):
+    """
+    Operands of an n-ary node: children of the same type that have no other
+    parent are replaced by their own operands, shared ones are kept whole so
+    they are evaluated once.
+    """
+    operands = {}
+    for child in children:
+        if isinstance(child, node_type) and parents.get(child.key, 0) == 1:
+            for operand in child._operands(parents):
+                operands.setdefault(operand.key, operand)
+        else:
+            operands.setdefault(child.key, child)
+    return list(operands.values())
+
+
+class Union(Node):
+    def __init__(self, *children):
+        super().__init__()
+        # Empty operands and repeated subtrees add nothing
+        unique = {}
+        for child in map(_node, children):
+            if child.bounds is not None:
+                unique.setdefault(child.key, child)
+        self.children = list(unique.values())
+
+    @property
+    def faces(self):
+        return sum(child.faces for child in self.children)
+
+    def _key_parts(self):
+        # A union does not depend on the order of its operands
+        return ("union", tuple(sorted(child.key for child in self.children)))
+
+    def _compute_bounds(self):
+        if not self.children:
+            return None
+        bounds = np.array([child.bounds for child in self.children])
+        return np.array([bounds[:, 0].min(axis=0), bounds[:, 1].max(axis=0)])
+
+    def _children(self):
+        return self.children
+
+    def _operands(self, parents):
+        # a | (b | c) is one n-ary union unless b | c is used elsewhere as well
+        return _merged(Union, self.children, parents)
+
+    def _step(self, operands):
+        step = super()._step(operands)
+        step["boolean"] = len(operands) > 1
+        step["cost"] = sum(operand.faces for operand in operands) if step["boolean"] else 0
+        return step
+
+    def _compute(self, operands, memo, parents, engine, verbose):
+        if not operands:
+            return _empty_mesh()
+        meshes = [operand._evaluate(memo, parents, engine, verbose) for operand in operands]
+        if len(meshes) == 1:
+            return meshes[0]
+        # Overlapping operands are united per group, disjoint groups concatenated
+        mesh, timings = batch_union(meshes, engine=engine)
+        if verbose:
+            print(f"union {self.key[:8]}: {len(meshes)} operands, {timings['total']:.3f} s")
+        return mesh
+
+
+class Difference(Node):
+    def __init__(self, target, *cutters):
+        super().__init__()
+        target = _node(target)
+        cutters = [_node(cutter) for cutter in cutters]
+        self.target = target
+
+        # Cutters that cannot touch the target are dropped before evaluation
+        unique = {}
+        for cutter in cutters:
+            if _bounds_overlap(target.bounds, cutter.bounds):
+                unique.setdefault(cutter.key, cutter)
+        self.cutters = list(unique.values())
+        self.pruned = len(cutters) - len(self.cutters)
+
+    @property
+    def faces(self):
+        return self.target.faces + sum(cutter.faces for cutter in self.cutters)
+
+    def _key_parts(self):
+        return ("difference", self.target.key, tuple(sorted(cutter.key for cutter in self.cutters)))
+
+    def _compute_bounds(self):
+        return self.target.bounds
+
+    def _children(self):
+        return [self.target] + self.cutters
+
+    def _operands(self, parents):
+        """
+        The target followed by the cutters. (a - b) - c becomes a - b - c and
+        a - (b | c) becomes a - b - c, one boolean instead of two, unless the
+        inner node is used elsewhere as well.
+        """
+        target, cutters = self.target, self.cutters
+        if isinstance(target, Difference) and parents.get(target.key, 0) == 1:
+            inner = target._operands(parents)
+            target, cutters = inner[0], inner[1:] + cutters
+        cutters = _merged(Union, cutters, parents)
+        # Operands of merged unions are pruned against the target as well
+        return [target] + [cutter for cutter in cutters if _bounds_overlap(target.bounds, cutter.bounds)]
+
+    def _step(self, operands):
+        step = super()._step(operands)
+        step["boolean"] = len(operands) > 1
+        step["cost"] = sum(operand.faces for operand in operands) if step["boolean"] else 0
+        step["pruned"] = self.pruned
+        return step
+
+    def _compute(self, operands, memo, parents, engine, verbose):
+        target = operands[0]._evaluate(memo, parents, engine, verbose)
+        if len(operands) == 1:
+            return target
+        cutters = [cutter._evaluate(memo, parents, engine, verbose) for cutter in operands[1:]]
+        mesh, timings = batch_difference(target, cutters, engine=engine)
+        if verbose:
+            print(f"difference {self.key[:8]}: {len(cutters)} cutters, {timings['total']:.3f} s")
+        return mesh
+
+
+class Intersection(Node):
+    def __init__(self, *children):
+        super().__init__()
+        unique = {}
+        for child in map(_node, children):
+            unique.setdefault(child.key, child)
+        self.children = list(unique.values())
+
+    @property
+    def faces(self):
+        return 0 if self.bounds is None else sum(child.faces for child in self.children)
+
+    def _key_parts(self):
+        return ("intersection", tuple(sorted(child.key for child in self.children)))
+
+    def _compute_bounds(self):
+        if not self.children or any(child.bounds is None for child in self.children):
+            return None
+        bounds = np.array([child.bounds for child in self.children])
+        lower, upper = bounds[:, 0].max(axis=0), bounds[:, 1].min(axis=0)
+        # Operands whose boxes don't all overlap have an empty intersection
+        return None if np.any(lower > upper) else np.array([lower, upper])
+
+    def _children(self):
+        return self.children
+
+    def _operands(self, parents):
+        # Known to be empty without evaluating anything
+        return [] if self.bounds is None else _merged(Intersection, self.children, parents)
+
+    def _step(self, operands):
+        step = super()._step(operands)
+        step["boolean"] = len(operands) > 1
+        step["cost"] = sum(operand.faces for operand in operands) if step["boolean"] else 0
+        return step
+
+    def _compute(self, operands, memo, parents, engine, verbose):
+        if not operands:
+            return _empty_mesh()
+        meshes = [operand._evaluate(memo, parents, engine, verbose) for operand in operands]
+        if len(meshes) == 1:
+            return meshes[0]
+        start = time.time()
+        mesh = trimesh.boolean.intersection(meshes, engine=engine)
+        if verbose:
+            print(f"intersection {self.key[:8]}: {len(meshes)} operands, {time.time() - start:.3f} s")
+        return mesh
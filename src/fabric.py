@@ -1,5 +1,9 @@
+import os
+
 import trimesh
 import numpy as np
+from assembly import Assembly, to_scene
+from utils import parallel_union, print_timings
 
 
 def fabric_piece(square_side_length, thickness, inner_radius, tolerance=0.5):
@@ -76,46 +80,46 @@ if __name__ == "__main__":
     x_size = 4
     y_size = 4
 
+    pitch = square_side_length + thickness + tolerance*2
+
+    # One tile mesh placed on the grid
     piece = fabric_piece(square_side_length, thickness, inner_radius, tolerance)
-    pieces = []
-    for ii in range(x_size):
-        for jj in range(y_size):
-            x_pos = ii * (square_side_length + thickness + tolerance*2)
-            y_pos = jj * (square_side_length + thickness + tolerance*2)
-            new_piece = piece.copy()
-            new_piece = new_piece.apply_translation([x_pos, y_pos, 0])
-            pieces.append(new_piece)
-    fabric = trimesh.boolean.union(pieces)
+    tiles = Assembly.from_translations(
+        piece,
+        [[ii * pitch, jj * pitch, 0] for ii in range(x_size) for jj in range(y_size)],
+        name="tile"
+    )
+
+    # The tiles are united in worker processes, neighbours first
+    fabric, timings = parallel_union(tiles.instances())
+    print_timings("tiles", timings)
     print(fabric.is_volume)
     # fabric.show()
 
+    # One rod mesh, along Y between rows and rotated along X between columns
     rod = fabric_connecting_rod(square_side_length, inner_radius, thickness, tolerance)
-    rod_rotate = rod.copy()
     rotation_matrix = trimesh.transformations.rotation_matrix(
         np.radians(90),  # Angle in radians
         [0, 0, 1]        # Rotation axis (x-axis)
-    )    
-    rod_rotate.apply_transform(rotation_matrix)    
-
-    rods = []
-    for ii in range(x_size):
-        for jj in range(y_size-1):
-            x_pos = ii * (square_side_length + thickness+ tolerance*2) 
-            y_pos = jj * (square_side_length + thickness+ tolerance*2) + ((square_side_length + thickness+ tolerance*2)/2)
-            new_rod = rod.copy()
-            new_rod = new_rod.apply_translation([x_pos, y_pos, 0])
-            rods.append(new_rod)
-    for ii in range(x_size-1):
-        for jj in range(y_size):
-            x_pos = ii * (square_side_length + thickness+ tolerance*2) + ((square_side_length + thickness+ tolerance*2)/2)
-            y_pos = jj * (square_side_length + thickness+ tolerance*2) 
-            new_rod = rod_rotate.copy()
-            new_rod = new_rod.apply_translation([x_pos, y_pos, 0])
-            rods.append(new_rod)                   
-    all_rods = trimesh.boolean.union(rods)    
+    )
+    rod_transforms = [
+        trimesh.transformations.translation_matrix([ii * pitch, jj * pitch + pitch / 2, 0])
+        for ii in range(x_size)
+        for jj in range(y_size-1)
+    ] + [
+        trimesh.transformations.translation_matrix([ii * pitch + pitch / 2, jj * pitch, 0]) @ rotation_matrix
+        for ii in range(x_size-1)
+        for jj in range(y_size)
+    ]
+    rods = Assembly(rod, rod_transforms, name="rod")
+
+    all_rods, timings = parallel_union(rods.instances())
+    print_timings("rods", timings)
     print(all_rods.is_volume)
     # all_rods.show()
 
     mesh = trimesh.util.concatenate([fabric, all_rods])
     # mesh.show()
-    mesh.export("~/Downloads/fabric_test.stl")
\ No newline at end of file
+    mesh.export("~/Downloads/fabric_test.stl")
+    # glTF keeps one tile and one rod mesh with a node per instance
+    to_scene(tiles, rods).export(os.path.expanduser("~/Downloads/fabric_test.glb"))
\ No newline at end of file
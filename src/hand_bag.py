@@ -5,109 +5,83 @@ from shapely.geometry import box
 from shapely.affinity import scale
 from shapely.ops import unary_union
 import trimesh.transformations as tra
+from tessellation import segments_for_radius
+import sketch
 
 
 def create_rounded_rectangle(length, width, radius, height=1.0):
-    # Step 1: Create the center box
-    center_box = trimesh.primitives.Box(extents=[length - 2 * radius, width - 2 * radius, height])
-    center_box.apply_translation([0, 0, height / 2])
-
-    # Step 2: Create the four corner cylinders
-    corners = []
-    corner_positions = [
-        (length / 2 - radius, width / 2 - radius),   # Top right
-        (-length / 2 + radius, width / 2 - radius),  # Top left
-        (length / 2 - radius, -width / 2 + radius),  # Bottom right
-        (-length / 2 + radius, -width / 2 + radius)  # Bottom left
-    ]
-    for pos in corner_positions:
-        cylinder = trimesh.primitives.Cylinder(radius=radius, height=height, sections=32)
-        cylinder.apply_translation([pos[0], pos[1], height / 2])
-        corners.append(cylinder)
-    
-    # Step 3: Create the two horizontal boxes
-    horizontal_boxes = []
-    horizontal_box_top = trimesh.primitives.Box(extents=[length - 2*radius, 2 * radius, height])
-    horizontal_box_top.apply_translation([0, width / 2 - radius, height / 2])
-    horizontal_boxes.append(horizontal_box_top)
-    
-    horizontal_box_bottom = trimesh.primitives.Box(extents=[length - 2*radius, 2 * radius, height])
-    horizontal_box_bottom.apply_translation([0, -width / 2 + radius, height / 2])
-    horizontal_boxes.append(horizontal_box_bottom)
-    
-    # Step 4: Create the two vertical boxes
-    vertical_boxes = []
-    vertical_box_right = trimesh.primitives.Box(extents=[2 * radius, width - 2*radius, height])
-    vertical_box_right.apply_translation([length / 2 - radius, 0, height / 2])
-    vertical_boxes.append(vertical_box_right)
-    
-    vertical_box_left = trimesh.primitives.Box(extents=[2 * radius, width - 2*radius, height])
-    vertical_box_left.apply_translation([-length / 2 + radius, 0, height / 2])
-    vertical_boxes.append(vertical_box_left)
-    
-    # Step 5: Combine all parts (center box, corners, horizontal and vertical boxes)
-    combined = center_box
-    for part in corners + horizontal_boxes + vertical_boxes:
-    # for part in corners:
-        combined = combined.union(part)
-
-    return combined
+    # Extrude the rounded outline in one step, from z = 0 to height
+    return sketch.extrude(sketch.rounded_rectangle(length, width, radius), height)
 
 def create_thin_rounded_rectangle_ring(length, width, radius, thickness, height=1.0):
-    # Step 1: Create the outer rounded rectangle
-    rectangle1 = create_rounded_rectangle(length, width, radius, height)
-    
-    # Step 2: Create the inner rounded rectangle (smaller dimensions)
-    rectangle2 = create_rounded_rectangle(
-        length - thickness, 
-        width - thickness, 
-        radius - thickness / 2, 
-        height
+    # The outer rounded rectangle minus the inner one (smaller dimensions), in 2D
+    ring = sketch.difference(
+        sketch.rounded_rectangle(length, width, radius),
+        sketch.rounded_rectangle(length - thickness, width - thickness, radius - thickness / 2)
     )
-    
-    # Step 3: Subtract the inner rectangle from the outer rectangle to create the ring
-    ring = rectangle1.difference(rectangle2)
-    
-    return ring
+    return sketch.extrude(ring, height)
+
+def _clamped_taper_step(taper_rate, size, steps, wall_thickness):
+    # Per-layer growth, limited so that no layer overhangs the one below by more than half a wall
+    taper_step = (taper_rate - 1.0) / steps
+    if abs(taper_step * size) > 0.5 * wall_thickness:
+        taper_step = np.sign(taper_step) * 0.5 * wall_thickness / size
+    return taper_step
+
+
+def _bag_shell(base_length, base_width, corner_radius, base_thickness, wall_thickness, bag_height,
+               l_taper_step, w_taper_step, inner_radius_offset, floor_height):
+    """
+    Loft the bag in one pass: the outer wall from the base outline up to the
+    last tapered outline, and a cavity from floor_height to the same top.
+
+    Layer ii of the former slice stack started at base_thickness / 2 +
+    (ii + 1 / 2) * wall_thickness; the loft keeps those heights and outlines,
+    so only the top and bottom sections are needed.
+    """
+    steps = int(bag_height / wall_thickness)
+    c_taper_step = l_taper_step * 0.5 + w_taper_step * 0.5
+    wall_start = base_thickness / 2 + wall_thickness / 2
+    top = wall_start + steps * wall_thickness
+
+    # All outlines share the corner segments of the largest corner, so the
+    # loft pairs their vertices instead of resampling them
+    largest_radius = corner_radius * max(1.0, 1.0 + (steps - 1) * c_taper_step)
+    segments = sketch.corner_segments(largest_radius)
+
+    def outline(ii, inset=0.0, radius_offset=0.0):
+        # Cross section of layer ii, which may be fractional
+        return sketch.rounded_rectangle(
+            base_length * (1.0 + ii * l_taper_step) - inset,
+            base_width * (1.0 + ii * w_taper_step) - inset,
+            corner_radius * (1.0 + ii * c_taper_step) - radius_offset,
+            segments=segments
+        )
+
+    floor_layer = max(0.0, (floor_height - wall_start) / wall_thickness)
+    return sketch.loft_shell(
+        [outline(0), outline(0), outline(steps - 1)],
+        [0.0, wall_start, top],
+        [outline(floor_layer, wall_thickness, inner_radius_offset), outline(steps - 1, wall_thickness, inner_radius_offset)],
+        [floor_height, top]
+    )
+
 
 def create_a_bag(base_length, base_width, corner_radius, base_thickness, wall_thickness, bag_height, taper_rate=1.0):
     steps = int(bag_height / wall_thickness)
-    taper_step = (taper_rate - 1.0) / steps
-    if abs(taper_step * base_length) > 0.5 * wall_thickness:
-        taper_step = np.sign(taper_step) * 0.5 * wall_thickness / base_length
-    base = create_rounded_rectangle(base_length, base_width, corner_radius, base_thickness)
-    for ii in range(steps):
-        wall = create_thin_rounded_rectangle_ring(base_length * (1.0 + ii * taper_step), base_width * (1.0 + ii * taper_step), corner_radius * (1.0 + ii * taper_step), wall_thickness, wall_thickness)
-        wall.apply_translation([0, 0, base_thickness / 2+ii*wall_thickness + wall_thickness/2])
-        base = base.union(wall)
-    return base
+    taper_step = _clamped_taper_step(taper_rate, base_length, steps, wall_thickness)
+    # The walls sit on the full base, with a thinner corner radius inside
+    return _bag_shell(base_length, base_width, corner_radius, base_thickness, wall_thickness, bag_height,
+                      taper_step, taper_step, wall_thickness / 2, base_thickness)
 
 
 def create_a_bag_smooth(base_length, base_width, corner_radius, base_thickness, wall_thickness, bag_height, l_taper_rate=1.0, w_taper_rate=1.0):
     steps = int(bag_height / wall_thickness)
-    l_taper_step = (l_taper_rate - 1.0) / steps
-    w_taper_step = (w_taper_rate - 1.0) / steps
-    if abs(l_taper_step * base_length) > 0.5 * wall_thickness:
-        l_taper_step = np.sign(l_taper_step) * 0.5 * wall_thickness / base_length
-    if abs(w_taper_step * base_width) > 0.5 * wall_thickness:
-        w_taper_step = np.sign(w_taper_step) * 0.5 * wall_thickness / base_width
-    c_taper_step = l_taper_step * 0.5 + w_taper_step * 0.5
-    base = create_rounded_rectangle(base_length, base_width, corner_radius, base_thickness)
-    interior = None
-    for ii in range(steps):
-        wall = create_rounded_rectangle(base_length * (1.0 + ii * l_taper_step), base_width * (1.0 + ii * w_taper_step), corner_radius * (1.0 + ii * c_taper_step), wall_thickness)
-        wall.apply_translation([0, 0, base_thickness / 2+ii*wall_thickness + wall_thickness/2])
-        base = base.union(wall)
-        wall = create_rounded_rectangle(base_length * (1.0 + ii * l_taper_step)-wall_thickness, base_width * (1.0 + ii * w_taper_step) - wall_thickness, corner_radius * (1.0 + ii * c_taper_step), wall_thickness)
-        wall.apply_translation([0, 0, base_thickness / 2+ii*wall_thickness + wall_thickness/2])
-        if interior is None:
-            interior = wall
-        else :
-            interior = interior.union(wall)
-    base = base.convex_hull
-    interior = interior.convex_hull
-    base = base.difference(interior)
-    return base
+    l_taper_step = _clamped_taper_step(l_taper_rate, base_length, steps, wall_thickness)
+    w_taper_step = _clamped_taper_step(w_taper_rate, base_width, steps, wall_thickness)
+    # The cavity starts where the first wall layer did, inside the base
+    return _bag_shell(base_length, base_width, corner_radius, base_thickness, wall_thickness, bag_height,
+                      l_taper_step, w_taper_step, 0.0, base_thickness / 2 + wall_thickness / 2)
 
 
 def create_a_bag_with_handle_holes(bag, base_width, base_thickness, bag_height, hole_radius, hole_distance):
@@ -187,8 +161,8 @@ def create_rainbow_shape_handle(hole_radius, base_thickness, handle_distance, ta
     inner_radius = (handle_distance / 2) - hole_radius * 2
     
     # Create the outer circle and inner circle (subtracted to create a ring)
-    outer_cylinder = trimesh.primitives.Cylinder(radius=outer_radius, height=base_thickness, sections=64)
-    inner_cylinder = trimesh.primitives.Cylinder(radius=inner_radius, height=base_thickness, sections=64)
+    outer_cylinder = trimesh.primitives.Cylinder(radius=outer_radius, height=base_thickness, sections=segments_for_radius(outer_radius))
+    inner_cylinder = trimesh.primitives.Cylinder(radius=inner_radius, height=base_thickness, sections=segments_for_radius(inner_radius))
     
     # Subtract inner cylinder from outer cylinder to create the ring (rainbow shape)
     rainbow = outer_cylinder.difference(inner_cylinder)
@@ -1,9 +1,11 @@
 import numpy as np
 from PIL import Image
 import trimesh
+from shapely.affinity import scale
 import os
 import image_utils
 from utils import validate_and_repair_mesh
+from stl_utils import StreamingSTLWriter
 
 # Function to create a block at a specific position
 def create_block(x, y, height, pixel_size=1):
@@ -46,28 +48,319 @@ def center_mesh(mesh):
     
     return mesh
 
-def create_extruded_mesh(matrix, length, width, height):
-    blocks = []
+def pixel_corner_ids(matrix):
+    """
+    Vertex ids of the four corners of every pixel on a (rows+1) x (cols+1) grid.
+
+    Neighbouring pixels share their corner vertices. Where two set pixels
+    touch only at a corner, one of them gets its own copy of that vertex so
+    the extruded surface stays manifold.
+
+    Returns:
+    - corner_ids: (4, rows, cols) array with the ids of the (x0, y0),
+      (x1, y0), (x1, y1) and (x0, y1) corners of every pixel.
+    - corner_positions: (n, 2) array with the (row, col) grid position of every id.
+    """
     rows, cols = matrix.shape
-    
-    for i in range(rows):
-        for j in range(cols):
-            if matrix[i, j] == 1:
-                # Create a block at (i, j) with the specified height
-                block = create_block(i * length/rows, j * width / cols, height, pixel_size=length/rows)
-                # block.show()
-                blocks.append(block)
-    
-    # Combine all blocks into a single mesh
-    # combined = trimesh.util.concatenate(blocks)
-    combined = trimesh.boolean.union(blocks)
-    # combined = trimesh.union(blocks)
-    if not combined.is_volume:
-        combined = trimesh.util.concatenate(blocks)
-    # combined = validate_and_repair_mesh(combined)
+    mask = np.pad(matrix == 1, 1)
+    # The four pixels around every grid corner
+    a = mask[:-1, :-1]
+    b = mask[:-1, 1:]
+    c = mask[1:, :-1]
+    d = mask[1:, 1:]
+    pinch_ad = a & d & ~b & ~c
+    pinch_bc = b & c & ~a & ~d
+
+    grid_ids = np.arange((rows + 1) * (cols + 1)).reshape(rows + 1, cols + 1)
+    # Extra vertices for the pinched corners, used by pixel d or pixel c
+    alt_ids = np.full(grid_ids.shape, -1)
+    pinched = pinch_ad | pinch_bc
+    alt_ids[pinched] = grid_ids.size + np.arange(pinched.sum())
+
+    x0y0 = np.where(pinch_ad[:-1, :-1], alt_ids[:-1, :-1], grid_ids[:-1, :-1])
+    x0y1 = np.where(pinch_bc[:-1, 1:], alt_ids[:-1, 1:], grid_ids[:-1, 1:])
+    x1y0 = grid_ids[1:, :-1]
+    x1y1 = grid_ids[1:, 1:]
+    corner_ids = np.stack([x0y0, x1y0, x1y1, x0y1])
+
+    corner_positions = np.vstack([
+        np.column_stack(np.divmod(grid_ids.ravel(), cols + 1)),
+        np.argwhere(pinched)
+    ])
+    return corner_ids, corner_positions
+
+# Exposed side of a pixel: (row/col shift of the neighbour, run axis, corner at
+# the low end of the run, corner at the high end, whether the wall starts at
+# the low end). Walls run from their start to their end corner with the
+# outside on the right.
+PIXEL_WALLS = [
+    ((-1, 0), 1, 0, 3, False),
+    ((1, 0), 1, 1, 2, True),
+    ((0, -1), 0, 0, 1, True),
+    ((0, 1), 0, 3, 2, False),
+]
+
+def _exposed(filled, shift):
+    # Set pixels whose neighbour in the shift direction is unset or outside
+    padded = np.pad(filled, 1)
+    dx, dy = shift
+    neighbour = padded[1 + dx:padded.shape[0] - 1 + dx, 1 + dy:padded.shape[1] - 1 + dy]
+    return filled & ~neighbour
+
+def pixel_faces(filled, corner_ids):
+    # One quad per set pixel for the caps, one wall per exposed pixel side
+    x0y0, x1y0, x1y1, x0y1 = (ids[filled] for ids in corner_ids)
+    caps = np.vstack([
+        np.column_stack([x0y0, x1y0, x1y1]),
+        np.column_stack([x0y0, x1y1, x0y1]),
+    ])
+    walls = []
+    for shift, _, low, high, starts_low in PIXEL_WALLS:
+        exposed = _exposed(filled, shift)
+        ends = (corner_ids[low][exposed], corner_ids[high][exposed])
+        walls.append(np.column_stack(ends if starts_low else ends[::-1]))
+    return caps, np.vstack(walls), np.zeros((0, 2))
+
+def greedy_rectangles(filled):
+    """
+    Cover the set pixels with rectangles, greedily growing row runs downwards.
+
+    Returns:
+    - (n, 4) array of (row0, col0, row1, col1) with exclusive row1 and col1.
+    """
+    rows, cols = filled.shape
+    free = filled.copy()
+    rectangles = []
+    for ii in range(rows):
+        row = np.concatenate([[False], free[ii], [False]])
+        edges = np.flatnonzero(row[1:] != row[:-1])
+        for start, stop in zip(edges[::2], edges[1::2]):
+            end = ii + 1
+            while end < rows and free[end, start:stop].all():
+                end += 1
+            free[ii:end, start:stop] = False
+            rectangles.append((ii, start, end, stop))
+    return np.array(rectangles, dtype=np.int64).reshape(-1, 4)
+
+def merged_faces(filled, corner_ids):
+    """
+    Caps made of maximal rectangles and side walls merged along straight runs.
+
+    Every rectangle corner is kept as a vertex, and every face includes all
+    kept vertices on its border, so neighbouring faces meet edge to edge and
+    the mesh stays watertight. Rectangles with extra border vertices are
+    fanned from a new vertex at their center.
+    """
+    rows, cols = filled.shape
+    rectangles = greedy_rectangles(filled)
+    kept = np.zeros((rows + 1, cols + 1), dtype=bool)
+    for r, c in [(0, 1), (2, 1), (2, 3), (0, 3)]:
+        kept[rectangles[:, r], rectangles[:, c]] = True
+    num_corners = corner_ids.max() + 1
+
+    caps = []
+    centers = []
+    for r0, c0, r1, c1 in rectangles.tolist():
+        # Border vertices counter-clockwise from (r0, c0); intermediate
+        # vertices are never pinched, so they use the plain grid id
+        border = [corner_ids[0, r0, c0]]
+        border += [r * (cols + 1) + c0 for r in range(r0 + 1, r1) if kept[r, c0]]
+        border.append(corner_ids[1, r1 - 1, c0])
+        border += [r1 * (cols + 1) + c for c in range(c0 + 1, c1) if kept[r1, c]]
+        border.append(corner_ids[2, r1 - 1, c1 - 1])
+        border += [r * (cols + 1) + c1 for r in range(r1 - 1, r0, -1) if kept[r, c1]]
+        border.append(corner_ids[3, r0, c1 - 1])
+        border += [r0 * (cols + 1) + c for c in range(c1 - 1, c0, -1) if kept[r0, c]]
+        if len(border) == 4:
+            caps.append([border[0], border[1], border[2]])
+            caps.append([border[0], border[2], border[3]])
+        else:
+            center = num_corners + len(centers)
+            centers.append(((r0 + r1) / 2.0, (c0 + c1) / 2.0))
+            caps.extend([center, border[k - 1], border[k]] for k in range(len(border)))
+    caps = np.array(caps, dtype=np.int64).reshape(-1, 3)
+
+    # Corner k of every pixel is a kept vertex
+    kept_corners = [kept[:-1, :-1], kept[1:, :-1], kept[1:, 1:], kept[:-1, 1:]]
+    walls = []
+    for shift, axis, low, high, starts_low in PIXEL_WALLS:
+        exposed = _exposed(filled, shift)
+        # A wall segment breaks at the end of the run or at a kept vertex
+        run = np.pad(exposed, [(1, 1) if axis == 0 else (0, 0), (1, 1) if axis == 1 else (0, 0)])
+        before = run[:-2, :] if axis == 0 else run[:, :-2]
+        after = run[2:, :] if axis == 0 else run[:, 2:]
+        starts = exposed & (~before | kept_corners[low])
+        ends = exposed & (~after | kept_corners[high])
+        if axis == 0:
+            # Walk the runs column by column so starts and ends pair up
+            starts, ends = starts.T, ends.T
+            low_ids, high_ids = corner_ids[low].T[starts], corner_ids[high].T[ends]
+        else:
+            low_ids, high_ids = corner_ids[low][starts], corner_ids[high][ends]
+        ends = (low_ids, high_ids)
+        walls.append(np.column_stack(ends if starts_low else ends[::-1]))
+    return caps, np.vstack(walls), np.array(centers).reshape(-1, 2)
+
+def create_extruded_mesh(matrix, length, width, height, merge_faces=False):
+    """
+    Extrude the 1 pixels of a matrix into a watertight mesh.
+
+    Only the top and bottom faces of the set pixels and the side faces
+    between a set and an unset pixel are emitted, and neighbouring pixels
+    share vertices, so no boolean union is needed. With merge_faces the caps
+    are merged into rectangles and the side walls into straight runs, and
+    mesh.metadata records "triangles_saved" against the "pixel_triangles" of
+    the unmerged mesh.
+    """
+    rows, cols = matrix.shape
+    pixel_length = length / rows
+    pixel_width = width / cols
+
+    corner_ids, corner_positions = pixel_corner_ids(matrix)
+    filled = matrix == 1
+    if merge_faces:
+        caps, walls, centers = merged_faces(filled, corner_ids)
+    else:
+        caps, walls, centers = pixel_faces(filled, corner_ids)
+    positions = np.vstack([corner_positions, centers]) * [pixel_length, pixel_width]
+    # Bottom layer uses the vertex ids, the top layer is offset by layer_size
+    layer_size = len(positions)
+
+    a, b = walls[:, 0], walls[:, 1]
+    faces = np.vstack([
+        caps[:, ::-1],
+        caps + layer_size,
+        np.column_stack([a, b, b + layer_size]),
+        np.column_stack([a, b + layer_size, a + layer_size]),
+    ])
+
+    vertices = np.vstack([
+        np.column_stack([positions, np.zeros(layer_size)]),
+        np.column_stack([positions, np.full(layer_size, height)]),
+    ])
+    # Keep only the vertices the faces use
+    used, faces = np.unique(faces, return_inverse=True)
+    combined = trimesh.Trimesh(vertices=vertices[used], faces=faces.reshape(-1, 3), process=False)
+    if merge_faces:
+        # Two triangles per pixel cap and per exposed pixel side without merging
+        pixel_count = int(4 * filled.sum() + 2 * sum(_exposed(filled, wall[0]).sum() for wall in PIXEL_WALLS))
+        combined.metadata["pixel_triangles"] = pixel_count
+        combined.metadata["triangles_saved"] = pixel_count - len(combined.faces)
 
     return center_mesh(combined)
 
+def export_extruded_mesh_stl(matrix, length, width, height, output_path, rows_per_batch=64):
+    """
+    Stream the pixel extrusion of create_extruded_mesh straight to an STL file.
+
+    The triangles are generated a band of rows at a time and pushed into a
+    StreamingSTLWriter, so peak memory is one band instead of the whole mesh.
+    """
+    rows, cols = matrix.shape
+    pixel_size = np.array([length / rows, width / cols])
+    filled = matrix == 1
+    if not filled.any():
+        raise ValueError("The matrix has no 1 pixels to extrude")
+    exposed = [_exposed(filled, wall[0]) for wall in PIXEL_WALLS]
+
+    # Same placement as center_mesh on the full mesh
+    set_rows, set_cols = np.nonzero(filled.any(axis=1))[0], np.nonzero(filled.any(axis=0))[0]
+    low = np.array([set_rows[0], set_cols[0]]) * pixel_size
+    high = np.array([set_rows[-1] + 1, set_cols[-1] + 1]) * pixel_size
+    center = np.append((low + high) / 2, height / 2)
+
+    # (row, col) offsets of the x0y0, x1y0, x1y1 and x0y1 corners
+    corner_offsets = np.array([(0, 0), (1, 0), (1, 1), (0, 1)])
+
+    def corners(pixels, corner, z):
+        xy = (pixels + corner_offsets[corner]) * pixel_size
+        return np.column_stack([xy, np.full(len(pixels), z)]) - center
+
+    with StreamingSTLWriter(output_path) as writer:
+        for start in range(0, rows, rows_per_batch):
+            band = slice(start, min(start + rows_per_batch, rows))
+            triangles = []
+
+            pixels = np.argwhere(filled[band]) + [start, 0]
+            bottom = [corners(pixels, k, 0) for k in range(4)]
+            top = [corners(pixels, k, height) for k in range(4)]
+            triangles += [
+                np.stack([bottom[0], bottom[2], bottom[1]], axis=1),
+                np.stack([bottom[0], bottom[3], bottom[2]], axis=1),
+                np.stack([top[0], top[1], top[2]], axis=1),
+                np.stack([top[0], top[2], top[3]], axis=1),
+            ]
+
+            for (_, _, low_corner, high_corner, starts_low), side in zip(PIXEL_WALLS, exposed):
+                pixels = np.argwhere(side[band]) + [start, 0]
+                a, b = (low_corner, high_corner) if starts_low else (high_corner, low_corner)
+                a_bottom, b_bottom = corners(pixels, a, 0), corners(pixels, b, 0)
+                a_top, b_top = corners(pixels, a, height), corners(pixels, b, height)
+                triangles += [
+                    np.stack([a_bottom, b_bottom, b_top], axis=1),
+                    np.stack([a_bottom, b_top, a_top], axis=1),
+                ]
+            writer.write_triangles(np.concatenate(triangles))
+
+def create_heightmap_mesh(heights, length, width, base_height, relief_height):
+    """
+    Build a watertight solid whose top surface follows a height map.
+
+    Every pixel becomes a grid vertex at base_height + value * relief_height,
+    the border is closed with side walls down to z=0, and the flat bottom is
+    fanned from its center. Vertex and face indices are generated with array
+    operations, so large images need no per-pixel Python loop.
+
+    Parameters:
+    - heights: (rows, cols) array of values in [0, 1].
+    - length, width: Size of the model along the rows and the columns.
+    - base_height: Thickness where the value is 0.
+    - relief_height: Extra thickness where the value is 1.
+    """
+    rows, cols = heights.shape
+    if rows < 2 or cols < 2:
+        raise ValueError("A height map needs at least 2 x 2 pixels")
+    ii, jj = np.meshgrid(
+        np.linspace(0, length, rows), np.linspace(0, width, cols), indexing="ij"
+    )
+    top = np.column_stack([
+        ii.ravel(), jj.ravel(), base_height + relief_height * np.clip(heights, 0, 1).ravel()
+    ])
+    ids = np.arange(rows * cols).reshape(rows, cols)
+
+    # Two triangles per grid cell
+    x0y0, x1y0 = ids[:-1, :-1].ravel(), ids[1:, :-1].ravel()
+    x1y1, x0y1 = ids[1:, 1:].ravel(), ids[:-1, 1:].ravel()
+    surface = np.vstack([
+        np.column_stack([x0y0, x1y0, x1y1]),
+        np.column_stack([x0y0, x1y1, x0y1]),
+    ])
+
+    # Border of the grid, counter-clockwise seen from above
+    border = np.concatenate([
+        ids[:-1, 0], ids[-1, :-1], ids[:0:-1, -1], ids[0, :0:-1]
+    ])
+    num_top = rows * cols
+    bottom = np.column_stack([top[border, :2], np.zeros(len(border))])
+    bottom_ids = num_top + np.arange(len(border))
+    center_id = num_top + len(border)
+    center = [[length / 2.0, width / 2.0, 0.0]]
+
+    a_top, b_top = border, np.roll(border, -1)
+    a_bottom, b_bottom = bottom_ids, np.roll(bottom_ids, -1)
+    walls = np.vstack([
+        np.column_stack([a_bottom, b_bottom, b_top]),
+        np.column_stack([a_bottom, b_top, a_top]),
+    ])
+    floor = np.column_stack([np.full(len(border), center_id), b_bottom, a_bottom])
+
+    mesh = trimesh.Trimesh(
+        vertices=np.vstack([top, bottom, center]),
+        faces=np.vstack([surface, walls, floor]),
+        process=False
+    )
+    return center_mesh(mesh)
+
 def create_enclosing_box(mesh, z_offset=None):
     # Get the bounding box of the original mesh
     bounding_box = mesh.bounding_box
@@ -97,17 +390,17 @@ def scale_mesh(mesh, scale_factor):
     return mesh
 
 
-def image_to_3d_model(image_path, grayscale_output_path=None, final_width=100, final_length=100, final_height=2, invert=True):
+def image_to_3d_model(image_path, grayscale_output_path=None, final_width=100, final_length=100, final_height=2, invert=True, merge_faces=False):
     # Load the image
     img_array = image_utils.image_to_zeroones(image_path, grayscale_output_path, invert)
     final_width = img_array.shape[0] *1.0 / img_array.shape[1] * final_length
 
-    img_mesh = create_extruded_mesh(img_array, final_width, final_length, final_height)
+    img_mesh = create_extruded_mesh(img_array, final_width, final_length, final_height, merge_faces)
     # img_mesh.show()
     return img_mesh
 
-def image_to_3d_model_with_board(image_path, output_path, grayscale_output_path=None, final_width=100, final_length=100, final_height=2, invert=True):
-    img_mesh = image_to_3d_model(image_path, grayscale_output_path, final_width, final_length, final_height, invert)
+def image_to_3d_model_with_board(image_path, output_path, grayscale_output_path=None, final_width=100, final_length=100, final_height=2, invert=True, merge_faces=False):
+    img_mesh = image_to_3d_model(image_path, grayscale_output_path, final_width, final_length, final_height, invert, merge_faces)
     bottom_box = create_enclosing_box(img_mesh)
     # bottom_box.show()
 
@@ -118,6 +411,51 @@ def image_to_3d_model_with_board(image_path, output_path, grayscale_output_path=
     mesh.export(output_path)
     return mesh
 
+def create_vector_extruded_mesh(matrix, length, width, height, tolerance=0.5):
+    """
+    Extrude the traced outlines of the 1 pixels instead of the pixels.
+
+    The matrix is traced into polygons with holes (simplified to tolerance
+    pixels) and each polygon is extruded on its own, which gives smooth
+    outlines and far fewer faces than create_extruded_mesh.
+    """
+    rows, cols = matrix.shape
+    polygons = image_utils.trace_polygons(matrix, tolerance)
+    if not polygons:
+        raise ValueError("The matrix has no 1 pixels to extrude")
+
+    meshes = []
+    for polygon in polygons:
+        polygon = scale(polygon, xfact=length / rows, yfact=width / cols, origin=(0, 0))
+        meshes.append(trimesh.creation.extrude_polygon(polygon, height))
+    combined = trimesh.util.concatenate(meshes)
+
+    return center_mesh(combined)
+
+def stencil_to_vector_model(image_path, output_path=None, final_length=100, final_height=2, thick_factor=1, output_length=100, path_width=1, tolerance=0.5, with_board=False):
+    # The stencil sheet is the connected white area around the traced lines
+    stencil = image_utils.create_stencil(image_path, thick_factor=thick_factor, output_length=output_length)
+    connected = image_utils.stencil_to_connected(stencil, path_width)
+    sheet = (connected > 255 / 2) * 1
+    final_width = sheet.shape[0] *1.0 / sheet.shape[1] * final_length
+
+    mesh = create_vector_extruded_mesh(sheet, final_width, final_length, final_height, tolerance)
+    if with_board:
+        mesh = combine_mesh_with_box(mesh, create_enclosing_box(mesh))
+    if output_path is not None:
+        mesh.export(output_path)
+    return mesh
+
+def image_to_heightmap_model(image_path, output_path=None, grayscale_output_path=None, final_length=100, base_height=0.8, relief_height=2.2, invert=True, scale_longer_side=400):
+    # Lithophane style: with invert, dark pixels become the thickest
+    heights = image_utils.image_to_heightmap(image_path, grayscale_output_path, invert, scale_longer_side)
+    final_width = heights.shape[0] *1.0 / heights.shape[1] * final_length
+
+    mesh = create_heightmap_mesh(heights, final_width, final_length, base_height, relief_height)
+    if output_path is not None:
+        mesh.export(output_path)
+    return mesh
+
 if __name__ == "__main__":
     # Example usage
     # image_path = os.path.expanduser("~/Downloads/WechatIMG21.jpg")  # Replace with your image path
@@ -132,9 +470,8 @@ if __name__ == "__main__":
 
     image_path = os.path.expanduser("~/Downloads/ursamajor.jpg")
     img_array = image_utils.image_to_zeroones(image_path, None, False)
-    for ii in range(2):
-        img_array = image_utils.make_ones_bigger(img_array)
+    img_array = image_utils.dilate(img_array, radius=2, shape="cross")
     img_array = image_utils.zeroones_to_connected(img_array, path_width=20, do_plot=True)
     final_width = img_array.shape[0] *1.0 / img_array.shape[1] * 100
-    img_mesh = create_extruded_mesh(img_array, final_width, 100, 2)
+    img_mesh = create_extruded_mesh(img_array, final_width, 100, 2, merge_faces=True)
     img_mesh.show()
\ No newline at end of file
@@ -7,6 +7,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 import copy
+from shapely.geometry import LinearRing, Polygon
+from shapely.strtree import STRtree
 
 def bresenham_line(x1, y1, x2, y2):
     # List to store the path of points
@@ -24,7 +26,9 @@ def bresenham_line(x1, y1, x2, y2):
     if dx > dy:
         err = dx // 2
     else:
-        err = -dy // 2
+        # Round toward zero; -dy // 2 would floor and never reach a
+        # one-step diagonal end point
+        err = -(dy // 2)
 
     # Initialize the current point
     x, y = x1, y1
@@ -52,127 +56,265 @@ def bresenham_line(x1, y1, x2, y2):
     
     return points
 
-def connect_all_zeros(matrix, path_width):
-    max_x, max_y = matrix.shape
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    
-    # BFS function to find all connected components of 0s
-    def find_components():
-        visited = set()
-        components = []
-
-        def bfs(x, y):
-            component = []
-            queue = deque([(x, y)])
-            visited.add((x, y))
-            component.append((x, y))
-            
-            while queue:
-                cx, cy = queue.popleft()
-                
-                # Explore neighbors
-                for dx, dy in directions:
-                    nx, ny = cx + dx, cy + dy
-                    
-                    if 0 <= nx < max_x and 0 <= ny < max_y and (nx, ny) not in visited and matrix[nx][ny] == 0:
-                        visited.add((nx, ny))
-                        queue.append((nx, ny))
-                        component.append((nx, ny))
-            
-            return component
-        
-        # Find all components of 0s
-        for i in range(max_x):
-            for j in range(max_y):
-                if matrix[i][j] == 0 and (i, j) not in visited:
-                    components.append(bfs(i, j))
-        components = sorted(components, key=lambda x: len(x))        
-        return components
-    
-    def find_bordering_ones(component):
-        bordering_ones = set()
-        
-        for (x, y) in component:
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < max_x and 0 <= ny < max_y and matrix[nx][ny] == 1:
-                    bordering_ones.add((nx, ny))
-        
-        return bordering_ones
-
-    # Find neighboring 1s that could connect two components
-    def find_min_lattice_distance_optimized(c1, c2):
-        # Sort both collections by x-coordinate first, then by y-coordinate
-        c1_sorted = sorted(c1, key=lambda p: (p[0], p[1]))
-        c2_sorted = sorted(c2, key=lambda p: (p[0], p[1]))
-
-        # Initialize variables
-        i, j = 0, 0
-        min_distance = float('inf')
-        best_pair = None
-
-        # Two-pointer technique
-        while i < len(c1_sorted) and j < len(c2_sorted):
-            p1 = c1_sorted[i]
-            p2 = c2_sorted[j]
-
-            # Calculate Manhattan distance
-            dist = abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
-
-            if dist < min_distance:
-                min_distance = dist
-                best_pair = (p1, p2)
-
-            if min_distance == 0:
-                break
-
-            # Move the pointer that is behind (try to get closer points)
-            if p1[0] < p2[0] or (p1[0] == p2[0] and p1[1] < p2[1]):
-                i += 1
+class ZeroComponents:
+    """
+    Connected components (4-neighbour) of the 0 pixels in a matrix.
+
+    The components are labeled once with a scanline labeling pass that also
+    gives per-label sizes and bounding boxes. Later merges are tracked with a
+    label -> component lookup table (`roots`), so when new 0 pixels are drawn
+    only the region around them has to be relabeled.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.relabel()
+
+    def relabel(self):
+        zeros = (self.matrix == 0).astype(np.uint8)
+        num, labels, stats, _ = cv2.connectedComponentsWithStats(zeros, connectivity=4)
+        # Label 0 is the background, i.e. the 1 pixels
+        self.labels = labels
+        self.roots = np.arange(num)
+        self.sizes = stats[:, cv2.CC_STAT_AREA].astype(np.int64)
+        self.sizes[0] = 0
+        # Bounding boxes as (row_min, col_min, row_max, col_max), inclusive
+        top = stats[:, cv2.CC_STAT_TOP]
+        left = stats[:, cv2.CC_STAT_LEFT]
+        self.bboxes = np.column_stack([
+            top,
+            left,
+            top + stats[:, cv2.CC_STAT_HEIGHT] - 1,
+            left + stats[:, cv2.CC_STAT_WIDTH] - 1
+        ]).astype(np.int64)
+
+    def component_ids(self):
+        # Live components, smallest first
+        ids = np.flatnonzero((self.roots == np.arange(len(self.roots))) & (self.sizes > 0))
+        return ids[np.argsort(self.sizes[ids], kind="stable")]
+
+    def __len__(self):
+        return len(self.component_ids())
+
+    def component_map(self):
+        # Component id of every pixel, 0 for the 1 pixels
+        return self.roots[self.labels]
+
+    def drop_small(self, max_size=4):
+        # One pass over the label sizes: fill every component of max_size pixels or fewer
+        small = (self.sizes <= max_size) & (self.sizes > 0)
+        small_pixels = small[self.component_map()]
+        self.matrix[small_pixels] = 1
+        self.labels[small_pixels] = 0
+        self.sizes[small] = 0
+
+    def update_region(self, x_min, y_min, x_max, y_max):
+        """
+        Update the labels after 0 pixels were added inside the given box.
+
+        Drawing only adds 0 pixels, so components can merge but never split.
+        The box (grown by one pixel) is labeled on its own, and every global
+        component touching a local component is merged into one.
+        """
+        max_x, max_y = self.matrix.shape
+        x_min, y_min = max(x_min - 1, 0), max(y_min - 1, 0)
+        x_max, y_max = min(x_max + 1, max_x - 1), min(y_max + 1, max_y - 1)
+        window = (slice(x_min, x_max + 1), slice(y_min, y_max + 1))
+
+        zeros = (self.matrix[window] == 0).astype(np.uint8)
+        _, local = cv2.connectedComponents(zeros, connectivity=4)
+        old = self.roots[self.labels[window]]
+        window_labels = self.labels[window]
+
+        for local_id in np.unique(local[local > 0]):
+            pixels = local == local_id
+            # Earlier merges in this loop may have retired some of these ids
+            touched = np.unique(self.roots[old[pixels & (old > 0)]])
+            new_pixels = pixels & (old == 0)
+            if len(touched) == 0:
+                # A bridge that touches no existing component gets a new label
+                target = len(self.roots)
+                self.roots = np.append(self.roots, target)
+                self.sizes = np.append(self.sizes, 0)
+                self.bboxes = np.vstack([self.bboxes, [max_x, max_y, -1, -1]])
             else:
-                j += 1
+                target = touched[0]
+                others = touched[1:]
+                if len(others) > 0:
+                    self.roots[np.isin(self.roots, others)] = target
+                    self.sizes[target] += self.sizes[others].sum()
+                    self.sizes[others] = 0
+                    self.bboxes[target, :2] = np.minimum(self.bboxes[target, :2], self.bboxes[others, :2].min(axis=0))
+                    self.bboxes[target, 2:] = np.maximum(self.bboxes[target, 2:], self.bboxes[others, 2:].max(axis=0))
+
+            if new_pixels.any():
+                window_labels[new_pixels] = target
+                self.sizes[target] += new_pixels.sum()
+                x, y = np.nonzero(new_pixels)
+                self.bboxes[target] = [
+                    min(self.bboxes[target, 0], x.min() + x_min),
+                    min(self.bboxes[target, 1], y.min() + y_min),
+                    max(self.bboxes[target, 2], x.max() + x_min),
+                    max(self.bboxes[target, 3], y.max() + y_min)
+                ]
+
+
+def plan_bridges(components):
+    """
+    Plan the bridges that connect all 0 components with the least total length.
+
+    A labeled distance transform assigns every pixel to its nearest component
+    pixel. Components whose regions touch are candidate neighbours, and the
+    exact distance between the two nearest pixels is the bridge length. A
+    minimum spanning tree over these candidates picks the bridges.
+
+    Parameters:
+    - components: ZeroComponents of the matrix.
+
+    Returns:
+    - A list of ((x1, y1), (x2, y2)) bridge end points, one per tree edge.
+    """
+    comp = components.component_map()
+    # Every component pixel is a seed of the distance transform
+    seeds_mask = (comp == 0).astype(np.uint8)
+    _, seed_labels = cv2.distanceTransformWithLabels(
+        seeds_mask, cv2.DIST_L2, cv2.DIST_MASK_5, labelType=cv2.DIST_LABEL_PIXEL
+    )
+    # Pixel labels are handed out in raster order of the seeds
+    seeds = np.argwhere(seeds_mask == 0)
+    nearest = seeds[seed_labels - 1]
+    owner = comp[nearest[..., 0], nearest[..., 1]]
+
+    # Neighbouring pixels that belong to different components give candidate bridges
+    candidates = []
+    for a, b in [((slice(None), slice(None, -1)), (slice(None), slice(1, None))),
+                 ((slice(None, -1), slice(None)), (slice(1, None), slice(None)))]:
+        differ = owner[a] != owner[b]
+        candidates.append((owner[a][differ], owner[b][differ], nearest[a][differ], nearest[b][differ]))
+    owner_a = np.concatenate([c[0] for c in candidates])
+    owner_b = np.concatenate([c[1] for c in candidates])
+    point_a = np.concatenate([c[2] for c in candidates])
+    point_b = np.concatenate([c[3] for c in candidates])
+    if len(owner_a) == 0:
+        return []
+
+    # Keep the shortest candidate for every pair of components
+    lengths = np.hypot(*(point_a - point_b).T)
+    low, high = np.minimum(owner_a, owner_b), np.maximum(owner_a, owner_b)
+    order = np.lexsort((lengths, high, low))
+    low, high = low[order], high[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (low[1:] != low[:-1]) | (high[1:] != high[:-1])
+    edges = order[first]
+    edges = edges[np.argsort(lengths[edges], kind="stable")]
+
+    # Kruskal's algorithm over the candidate edges
+    parent = {comp_id: comp_id for comp_id in components.component_ids().tolist()}
+
+    def find(comp_id):
+        while parent[comp_id] != comp_id:
+            parent[comp_id] = parent[parent[comp_id]]
+            comp_id = parent[comp_id]
+        return comp_id
+
+    bridges = []
+    for edge in edges.tolist():
+        root_a, root_b = find(int(owner_a[edge])), find(int(owner_b[edge]))
+        if root_a == root_b:
+            continue
+        parent[root_a] = root_b
+        bridges.append((tuple(point_a[edge].tolist()), tuple(point_b[edge].tolist())))
+        if len(bridges) == len(parent) - 1:
+            break
+    return bridges
+
+
+def rasterize_segments(shape, starts, ends, width):
+    """
+    Rasterize thick line segments as capsules, all segments at once.
+
+    A pixel is set when its center lies within width / 2 of a segment. The
+    radius never goes below sqrt(2) / 2, the smallest capsule that keeps a
+    diagonal segment 4-connected.
+
+    Parameters:
+    - shape: (rows, cols) of the output mask.
+    - starts, ends: (N, 2) arrays of (x, y) segment end points in pixels.
+    - width: Width of the segments in pixels.
+
+    Returns:
+    - A boolean mask of the given shape, to OR into a matrix.
+    """
+    mask = np.zeros(shape, dtype=bool)
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    if len(starts) == 0:
+        return mask
+    radius = max(width / 2.0, np.sqrt(0.5))
+
+    # Pixel bounding box of every capsule, clipped to the matrix
+    low = np.floor(np.minimum(starts, ends) - radius).astype(np.int64)
+    high = np.ceil(np.maximum(starts, ends) + radius).astype(np.int64)
+    low = np.maximum(low, 0)
+    high = np.minimum(high, np.array(shape) - 1)
+    box_shape = np.maximum(high - low + 1, 0)
+    counts = box_shape[:, 0] * box_shape[:, 1]
+
+    # Test the candidate pixels of a bounded number of segments at a time
+    max_candidates = 1 << 22
+    chunk_start = 0
+    while chunk_start < len(starts):
+        chunk_end = chunk_start + 1
+        total = counts[chunk_start]
+        while chunk_end < len(starts) and total + counts[chunk_end] <= max_candidates:
+            total += counts[chunk_end]
+            chunk_end += 1
+        chunk = slice(chunk_start, chunk_end)
+        chunk_start = chunk_end
+
+        # Enumerate the pixels of every box without a Python loop
+        segment = np.repeat(np.arange(chunk.start, chunk.stop), counts[chunk])
+        offset = np.arange(len(segment)) - np.repeat(np.cumsum(counts[chunk]) - counts[chunk], counts[chunk])
+        box_cols = box_shape[segment, 1]
+        x = low[segment, 0] + offset // box_cols
+        y = low[segment, 1] + offset % box_cols
+
+        # Distance from the pixel center to the closest point of its segment
+        a = starts[segment]
+        ab = ends[segment] - a
+        ap = np.column_stack((x, y)) - a
+        length2 = (ab ** 2).sum(axis=1)
+        t = np.divide((ap * ab).sum(axis=1), length2, out=np.zeros_like(length2), where=length2 > 0)
+        t = np.clip(t, 0.0, 1.0)
+        distance2 = ((ap - ab * t[:, None]) ** 2).sum(axis=1)
+
+        inside = distance2 <= radius ** 2
+        mask[x[inside], y[inside]] = True
+    return mask
 
-        return best_pair, min_distance
-    
-    components = find_components()
 
-    for component in components:
-        if len(component) <= 4: ## less than 4 pixels, do black
-            for x, y in component:
-                matrix[x, y] = 1
+def connect_all_zeros(matrix, path_width):
+    components = ZeroComponents(matrix)
+
+    ## less than 4 pixels, do black
+    components.drop_small(4)
 
-    components = find_components()
     # Step 1: Check if the matrix is already connected
     if len(components) <= 1:
         return matrix  # Already connected
     
-    # Step 3: Find bordering 1s that can connect the components
-    # Loop over all pairs of components and attempt to connect them
+    # Step 2: Plan all the bridges at once and draw them in one pass
     while len(components) > 1:
-        component_boarders = [find_bordering_ones(component) for component in components]
-        # Get the first disconnected component
         print(len(components))
-        best_pair = None
-        min_distance = 10000
-        for c1 in component_boarders:
-            for c2 in component_boarders:
-                if c1 != c2:
-                    best_pair_, min_distance_ = find_min_lattice_distance_optimized(c1, c2)
-                    if min_distance_ < min_distance:
-                        best_pair = best_pair_
-                        min_distance = min_distance_
-        shortest_path = bresenham_line(best_pair[0][0], best_pair[0][1], best_pair[1][0], best_pair[1][1])
-        for x, y in shortest_path:
-            matrix[x, y] = 0
-            for ii in range(path_width):
-                new_x = x + ii - path_width // 2
-                new_y = y + ii - path_width // 2
-                new_x = 0 if new_x < 0 else new_x
-                new_y = 0 if new_y < 0 else new_y
-                new_x = max_x - 1 if new_x >= max_x else new_x
-                new_y = max_y - 1 if new_y >= max_y else new_y
-                matrix[new_x, new_y] = 0
-        components = find_components() 
+        bridges = np.array(plan_bridges(components)).reshape(-1, 2, 2)
+        bridge_mask = rasterize_segments(matrix.shape, bridges[:, 0], bridges[:, 1], path_width)
+        matrix[bridge_mask] = 0
+        # Only the area around the new bridges needs relabeling
+        radius = int(np.ceil(max(path_width / 2.0, 1)))
+        for start, end in bridges:
+            low = np.minimum(start, end) - radius
+            high = np.maximum(start, end) + radius
+            components.update_region(*low, *high)
    
     return matrix
 
@@ -242,7 +384,7 @@ def zeroones_to_connected(zero_ones,  path_width=1, do_plot=False):
         plt.show()       
     return connected
 
-def image_to_zeroones(image_path,grayscale_output_path=None, invert=True, scale_longer_side=400):
+def load_grayscale_image(image_path, grayscale_output_path=None, scale_longer_side=400):
     img = Image.open(image_path).convert('L')  # Convert to grayscale
 
     if img.size[0] < img.size[1]:
@@ -260,7 +402,17 @@ def image_to_zeroones(image_path,grayscale_output_path=None, invert=True, scale_
         img.save(grayscale_output_path)
 
     # Convert image to numpy array
-    img_array = np.array(img)
+    return np.array(img)
+
+def image_to_heightmap(image_path, grayscale_output_path=None, invert=True, scale_longer_side=400):
+    # Keep the tonal information: 0.0 for white, 1.0 for black when inverted
+    img_array = load_grayscale_image(image_path, grayscale_output_path, scale_longer_side) / 255.0
+    if invert:
+        img_array = 1.0 - img_array
+    return img_array
+
+def image_to_zeroones(image_path,grayscale_output_path=None, invert=True, scale_longer_side=400):
+    img_array = load_grayscale_image(image_path, grayscale_output_path, scale_longer_side)
 
     # Normalize the image array
     if invert:
@@ -273,17 +425,165 @@ def image_to_zeroones(image_path,grayscale_output_path=None, invert=True, scale_
     img_array = (img_array > val_thresh) * 1.0 
     return img_array    
 
-def make_ones_bigger(matrix):
-    new_matrix = copy.copy(matrix)
-    for ii in range(matrix.shape[0]):
-        for jj in range(matrix.shape[1]):
-            if matrix[ii, jj] == 1:
-                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    new_ii = ii + dx
-                    new_jj = jj + dy
-                    if new_ii >=0 and new_ii < matrix.shape[0] and new_jj >=0 and new_jj < matrix.shape[1]:
-                        new_matrix[new_ii, new_jj] = 1
-    return new_matrix
+def _distance_to_ones(matrix, shape):
+    # Distance of every pixel to the nearest 1, measured in the metric whose
+    # unit ball is the structuring element
+    metrics = {
+        "disk": (cv2.DIST_L2, cv2.DIST_MASK_PRECISE),
+        "square": (cv2.DIST_C, 3),
+        "cross": (cv2.DIST_L1, 3),
+    }
+    if shape not in metrics:
+        raise ValueError(f"Unknown structuring element {shape}, use one of {list(metrics)}")
+    metric, mask_size = metrics[shape]
+    # distanceTransform measures the distance to the nearest zero pixel
+    not_ones = (matrix != 1).astype(np.uint8)
+    return cv2.distanceTransform(not_ones, metric, mask_size)
+
+def dilate(matrix, radius=1, shape="disk"):
+    """
+    Grow the 1s of a 0/1 matrix by radius pixels.
+
+    The dilation is a threshold on a distance transform, so it costs the same
+    for any radius. shape picks the structuring element: "disk" (Euclidean),
+    "square" (chessboard) or "cross" (4-neighbour steps, the same as calling
+    make_ones_bigger radius times).
+
+    Returns:
+    - A 0/1 matrix with the dtype of the input.
+    """
+    if radius <= 0:
+        return (matrix == 1).astype(matrix.dtype)
+    if not (matrix == 1).any():
+        return np.zeros_like(matrix)
+    return (_distance_to_ones(matrix, shape) <= radius).astype(matrix.dtype)
+
+def erode(matrix, radius=1, shape="disk"):
+    # Shrinking the 1s is growing the 0s; pixels outside the matrix count as 1s
+    return (1 - dilate((matrix != 1).astype(matrix.dtype), radius, shape)).astype(matrix.dtype)
+
+def open_ones(matrix, radius=1, shape="disk"):
+    # Remove 1 features thinner than the structuring element
+    return dilate(erode(matrix, radius, shape), radius, shape)
+
+def close_ones(matrix, radius=1, shape="disk"):
+    # Fill 0 gaps thinner than the structuring element
+    return erode(dilate(matrix, radius, shape), radius, shape)
+
+def make_ones_bigger(matrix, radius=1):
+    return dilate(matrix, radius, shape="cross")
+
+def _marching_squares_table():
+    # Oriented contour segments for every cell case. A cell has corners
+    # v00, v10, v11, v01 (bits 1, 2, 4, 8) and edges W, S, E, N; the
+    # segments keep the 1 corners on their left. Saddle cells cut each 1
+    # corner off on its own, matching 4-connectivity.
+    corners = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    edges = {"W": (0.5, 0), "S": (1, 0.5), "E": (0.5, 1), "N": (0, 0.5)}
+    corner_edges = [("W", "N"), ("W", "S"), ("S", "E"), ("N", "E")]
+    edge_corners = {"W": (0, 1), "S": (1, 2), "E": (2, 3), "N": (3, 0)}
+
+    table = {}
+    for case in range(16):
+        inside = [bool(case >> k & 1) for k in range(4)]
+        if inside == [True, False, True, False] or inside == [False, True, False, True]:
+            pairs = [(corner_edges[k], k) for k in range(4) if inside[k]]
+        else:
+            crossing = tuple(e for e, (p, q) in edge_corners.items() if inside[p] != inside[q])
+            pairs = [(crossing, inside.index(True))] if crossing else []
+        segments = []
+        for (e1, e2), corner in pairs:
+            p, q = np.array(edges[e1]), np.array(edges[e2])
+            left = np.array([-(q - p)[1], (q - p)[0]])
+            if np.dot(np.array(corners[corner]) - p, left) < 0:
+                e1, e2 = e2, e1
+            segments.append((edges[e1], edges[e2]))
+        table[case] = segments
+    return table
+
+MARCHING_SQUARES_TABLE = _marching_squares_table()
+
+def _ring_polygons(coords):
+    """
+    Whether a traced ring is an outline (counter-clockwise) or a hole
+    (clockwise), and its polygons. The winding is read before an invalid ring
+    is repaired, since buffer(0) doesn't keep it, and a self-touching ring
+    can come back as several polygons.
+    """
+    is_outer = LinearRing(coords).is_ccw
+    ring = Polygon(coords)
+    if ring.is_valid and ring.area > 0:
+        return is_outer, [ring]
+    repaired = ring.buffer(0)
+    polygons = getattr(repaired, "geoms", [repaired])
+    return is_outer, [polygon for polygon in polygons if isinstance(polygon, Polygon) and not polygon.is_empty]
+
+def trace_polygons(matrix, tolerance=0.5):
+    """
+    Trace the 1 pixels of a matrix into polygons with holes.
+
+    Contours are found with marching squares through the pixel centers,
+    chained into rings (counter-clockwise outlines, clockwise holes) and
+    simplified to the given tolerance in pixels.
+
+    Returns:
+    - A list of shapely Polygons in (row, col) pixel coordinates.
+    """
+    inside = np.pad(matrix == 1, 1)
+    rows, cols = inside.shape
+    case = (inside[:-1, :-1] * 1 + inside[1:, :-1] * 2 + inside[1:, 1:] * 4 + inside[:-1, 1:] * 8)
+
+    # Segment end points on a doubled grid so they are exact integers
+    starts, ends = [], []
+    for cell_case, segments in MARCHING_SQUARES_TABLE.items():
+        cells = np.argwhere(case == cell_case) * 2
+        for p, q in segments:
+            starts.append(cells + (np.array(p) * 2).astype(np.int64))
+            ends.append(cells + (np.array(q) * 2).astype(np.int64))
+    if not starts:
+        return []
+    starts, ends = np.vstack(starts), np.vstack(ends)
+    if len(starts) == 0:
+        return []
+    key_base = 2 * cols + 1
+    start_keys = starts[:, 0] * key_base + starts[:, 1]
+    end_keys = ends[:, 0] * key_base + ends[:, 1]
+
+    # Every contour point has exactly one outgoing segment
+    order = np.argsort(start_keys)
+    next_segment = order[np.searchsorted(start_keys, end_keys, sorter=order)]
+    visited = np.zeros(len(starts), dtype=bool)
+    outers, holes = [], []
+    for first in range(len(starts)):
+        if visited[first]:
+            continue
+        ring = []
+        segment = first
+        while not visited[segment]:
+            visited[segment] = True
+            ring.append(segment)
+            segment = next_segment[segment]
+        # Back to pixel coordinates without the padding
+        is_outer, polygons = _ring_polygons(starts[ring] / 2.0 - 1)
+        (outers if is_outer else holes).extend(polygons)
+
+    # Every hole belongs to the smallest outline around it
+    outer_holes = [[] for _ in outers]
+    tree = STRtree(outers)
+    for hole in holes:
+        candidates = [k for k in tree.query(hole, predicate="within")]
+        if candidates:
+            owner = min(candidates, key=lambda k: outers[k].area)
+            outer_holes[owner].append(hole.exterior.coords)
+
+    polygons = []
+    for outer, hole_rings in zip(outers, outer_holes):
+        polygon = Polygon(outer.exterior.coords, hole_rings)
+        if tolerance > 0:
+            polygon = polygon.simplify(tolerance, preserve_topology=True)
+        if not polygon.is_empty:
+            polygons.append(polygon)
+    return polygons
 
 if __name__ == "__main__":
     # Example usage
@@ -4,9 +4,10 @@ import numpy as np
 import trimesh
 from shapely.geometry import Polygon
 
-from threaded_cylinder import create_threaded_cylinder, flip_z
+from threaded_cylinder import create_thread_pair, flip_z
 
 from text3d_utils import text_3d, text_3d_mesh
+import csg
 from utils import slice_plane_x, validate_and_repair_mesh, scale_mesh
 from baseball_themed_keychain import create_baseball_bat
 from image3d_simple import image_to_3d_model, image_utils, create_extruded_mesh
@@ -31,17 +32,18 @@ if __name__ == "__main__":
     # exit(0)
 
     ##patch for tpu
+    # The case is built lazily and only evaluated on export; the patched case
+    # is used twice below, and as a shared subtree it is evaluated once
     box = trimesh.creation.box([50, 50, 2])
     box = box.apply_translation([0, 0, 2/2])
-    case_mesh = case_mesh.union(box)
+    case_mesh = csg.leaf(case_mesh, "case") | box
 
     another_big_box = trimesh.creation.box([1000, 1000, 50])
     another_big_box = another_big_box.apply_translation([0, 0, 25 + 2])
-    case_bottom = case_mesh.difference(another_big_box)
-    # case_bottom.show()
-    case_bottom = case_bottom.apply_translation([0, 0, -1.4])
-    case_mesh = trimesh.boolean.union([case_mesh, case_bottom])
-    case_mesh = case_mesh.apply_translation([0, 0, 1.4])
+    case_bottom = case_mesh - another_big_box
+    # case_bottom.evaluate().show()
+    case_bottom = case_bottom.translate([0, 0, -1.4])
+    case_mesh = (case_mesh | case_bottom).translate([0, 0, 1.4])
 
     # case_mesh.show()
 
@@ -50,19 +52,17 @@ if __name__ == "__main__":
     thread_thickness = 1.5  # Thickness of the thread
     thread_pitch = 2      # Distance between thread peaks
 
-    # Create the threaded cylinder
-    threaded_cylinder = create_threaded_cylinder(radius, height, thread_thickness, thread_pitch)
+    # Create the threaded cylinder and its cutout with 0.2 mm clearance
+    threaded_cylinder, threaded_cylinder_cutout, _ = create_thread_pair(radius, height, thread_thickness, thread_pitch, clearance=0.2)
     threaded_cylinder = flip_z(threaded_cylinder)
-    
-    threaded_cylinder_cutout = create_threaded_cylinder(radius+0.2, height, thread_thickness, thread_pitch)    
     threaded_cylinder_cutout = flip_z(threaded_cylinder_cutout)
 
     # Visualize the mesh (requires pyglet or other 3D viewer support)
     # threaded_cylinder.show()
 
     threaded_cylinder_cutout.apply_translation([0, -20, 0])
-    case = case_mesh.difference(threaded_cylinder_cutout)
-    # case.show()
+    case = case_mesh - threaded_cylinder_cutout
+    # case.evaluate().show()
 
     # cylinder = trimesh.creation.cylinder(radius=radius * 1.3, height=height, sections=64)
     # cylinder = cylinder.apply_translation([0, 0, height/2])
@@ -1,23 +1,43 @@
 import trimesh
+from functools import lru_cache
 
+from tessellation import segments_for_radius
 
-def create_key_ring_loop(inner_radius=1.2, tube_radius=0.1, segments=64):
+
+@lru_cache(maxsize=None)
+def _key_ring_loop(inner_radius, tube_radius, major_sections, minor_sections):
+    key_ring = trimesh.creation.torus(
+        major_radius=inner_radius,
+        minor_radius=tube_radius,
+        major_sections=major_sections,
+        minor_sections=minor_sections
+    )
+    # The cached mesh is shared, so keep callers from modifying it in place
+    key_ring.vertices.flags.writeable = False
+    key_ring.faces.flags.writeable = False
+    return key_ring
+
+
+def create_key_ring_loop(inner_radius=1.2, tube_radius=0.1, segments=None):
     """
     Create a key ring loop (torus) to attach to the bat.
 
+    The torus is built once per set of parameters and copied afterwards.
+
     Parameters:
     - inner_radius: The distance from the center of the torus to the center of the tube.
     - tube_radius: The radius of the tube.
-    - segments: The number of segments for the torus mesh.
+    - segments: The number of segments around the ring, half of them around
+      the tube. If None, both follow the tessellation tolerance.
 
     Returns:
     - A Trimesh object representing the key ring loop.
     """
+    if segments is None:
+        major_sections = segments_for_radius(inner_radius + tube_radius)
+        minor_sections = segments_for_radius(tube_radius)
+    else:
+        major_sections, minor_sections = int(segments), int(segments) // 2
+
     # Create the torus (ring)
-    key_ring = trimesh.creation.torus(
-        # sections=segments,
-        sections_minor=segments // 2,
-        major_radius=inner_radius,
-        minor_radius=tube_radius
-    )
-    return key_ring
\ No newline at end of file
+    return _key_ring_loop(float(inner_radius), float(tube_radius), major_sections, minor_sections).copy()
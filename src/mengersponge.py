@@ -1,33 +1,68 @@
 import trimesh
 import numpy as np
 
+from stl_utils import StreamingSTLWriter
+from assembly import Assembly, translations
+
+# The 20 sub-cubes that are kept at every level, in units of the sub-cube size
+MENGER_OFFSETS = np.array([
+    (x, y, z)
+    for x in (-1, 0, 1)
+    for y in (-1, 0, 1)
+    for z in (-1, 0, 1)
+    if abs(x) + abs(y) + abs(z) > 1
+], dtype=float)
+
+def menger_assembly(level, size, position=(0, 0, 0)):
+    """
+    The level 0 cubes of a Menger sponge as instances of one unit cube.
+    """
+    centers, cube_size = next(menger_cube_centers(level, size, position, batch_cubes=20 ** level))
+    transforms = translations(centers)
+    transforms[:, :3, :3] *= cube_size
+    return Assembly(trimesh.creation.box(extents=[1, 1, 1]), transforms, name="cube")
+
 def create_menger_sponge(level, size, position=(0, 0, 0)):
-    if level == 0:
-        # Base case: create a simple cube
-        cube = trimesh.creation.box(extents=[size, size, size])
-        cube.apply_translation(position)
-        return cube
+    # All cubes in one mesh, expanded in a single batched product
+    return menger_assembly(level, size, position).to_mesh()
+
+def menger_cube_centers(level, size, position=(0, 0, 0), batch_cubes=20**4):
+    """
+    Yield the centers of the level 0 cubes of a Menger sponge in batches.
+
+    Each batch holds at most batch_cubes centers, so the whole sponge is
+    never in memory at once.
+
+    Yields:
+    - (centers, cube_size) with centers as an (n, 3) array.
+    """
+    position = np.asarray(position, dtype=float)
+    if 20 ** level <= batch_cubes:
+        centers = position[None]
+        for _ in range(level):
+            size /= 3.0
+            centers = (centers[:, None, :] + MENGER_OFFSETS[None] * size).reshape(-1, 3)
+        yield centers, size
+        return
 
-    # Subdivide the cube into 27 smaller cubes and remove the middle ones
     new_size = size / 3.0
-    cubes = []
-    offsets = [-new_size, 0, new_size]
-    for x in offsets:
-        for y in offsets:
-            for z in offsets:
-                if abs(x) + abs(y) + abs(z) > new_size:
-                    new_position = (position[0] + x, position[1] + y, position[2] + z)
-                    cubes.append(create_menger_sponge(level - 1, new_size, new_position))
-    
-    # Combine all smaller cubes into one mesh
-    return trimesh.util.concatenate(cubes)
-
-# Parameters for the Menger sponge
-level = 3  # Increase the level for more detail
-size = 50
-
-# Create the Menger sponge
-menger_sponge = create_menger_sponge(level, size)
-
-# Export to STL
-menger_sponge.export('~/Downloads/menger_sponge.stl')
+    for offset in MENGER_OFFSETS:
+        yield from menger_cube_centers(level - 1, new_size, position + offset * new_size, batch_cubes)
+
+def write_menger_sponge(writer, level, size, batch_cubes=20**4):
+    # Stream the cube triangles into a StreamingSTLWriter
+    unit_cube = trimesh.creation.box(extents=[1, 1, 1]).triangles
+    for centers, cube_size in menger_cube_centers(level, size, batch_cubes=batch_cubes):
+        writer.write_triangles(unit_cube[None] * cube_size + centers[:, None, None, :])
+
+if __name__ == "__main__":
+    # Parameters for the Menger sponge
+    level = 3  # Increase the level for more detail
+    size = 50
+
+    # Create the Menger sponge and export it to STL batch by batch
+    with StreamingSTLWriter('~/Downloads/menger_sponge.stl') as writer:
+        write_menger_sponge(writer, level, size)
+
+    # glTF stores the cube once with a node per cube instead
+    menger_assembly(level, size).export('~/Downloads/menger_sponge.glb')
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import tempfile
+import threading
+import zipfile
+
+import numpy as np
+import trimesh
+
+
+DEFAULT_CACHE_DIR = "~/.cache/python3d/meshes"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class MeshCache:
+    """
+    A persistent, content-addressed cache of meshes on disk.
+
+    Entries are stored as uncompressed .npz files holding the vertices and
+    faces, which load much faster than STL. The modification time of an entry
+    is refreshed on every hit, and the least recently used entries are deleted
+    when the cache grows beyond max_bytes.
+
+    Usage:
+        cache = MeshCache()
+        key = cache.key(openscad_version(), scad_code)
+        mesh = cache.get(key)
+        if mesh is None:
+            mesh = render(scad_code)
+            cache.put(key, mesh)
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        # Hash of all the parts that determine the mesh
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def get(self, key):
+        """
+        Return the cached mesh for key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                mesh = trimesh.Trimesh(vertices=data["vertices"], faces=data["faces"], process=False)
+            os.utime(path)
+        except OSError:
+            # Missing or evicted by another process
+            with self._lock:
+                self.misses += 1
+            return None
+        except (KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            # A corrupt or truncated entry, deleted so that it is written again
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return mesh
+
+    def put(self, key, mesh):
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, vertices=np.asarray(mesh.vertices), faces=np.asarray(mesh.faces))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        # Delete the least recently used entries until the cache fits
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                os.unlink(entry.path)
+
+    def stats(self):
+        size = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.name.endswith(".npz"))
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": size,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    # Shared cache for callers that do not manage their own
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MeshCache()
+    return _default_cache
@@ -0,0 +1,240 @@
+import numpy as np
+import trimesh
+
+
+# Deformers map an (n, 3) array of points to a new (n, 3) array in a few
+# vectorized NumPy operations. Apply one to a mesh with deform():
+#
+#     deform(text_mesh, wrap_cylinder, radius=40, axis=0)
+#
+# The axis arguments are coordinate indices: 0 = x, 1 = y, 2 = z.
+
+
+def deform(mesh, deformer, **params):
+    """
+    Apply a deformer to all vertices of a mesh.
+
+    The vertices are assigned as a whole, so trimesh drops its cached normals,
+    bounds and so on.
+
+    Parameters:
+    - mesh: trimesh.Trimesh, modified in place.
+    - deformer: One of the functions in this module, or any function taking an
+      (n, 3) array and keyword parameters.
+    - params: Keyword parameters for the deformer.
+
+    Returns:
+    - The deformed mesh.
+    """
+    mesh.vertices = deformer(np.asarray(mesh.vertices, dtype=np.float64), **params)
+    return mesh
+
+
+def wrap_cylinder(points, radius, axis=0):
+    """
+    Wrap the XY plane around a cylinder whose axis passes through the origin.
+
+    Distances along `axis` become arc lengths on the cylinder, z becomes the
+    height above its surface, and the other coordinate is kept. A flat sheet at
+    z = 0 ends up on the cylinder of the given radius, with its center at the top.
+
+    Parameters:
+    - points: (n, 3) array.
+    - radius: Radius of the cylinder.
+    - axis: 0 to wrap x around a cylinder along y, 1 to wrap y around a cylinder along x.
+    """
+    points = np.array(points, dtype=np.float64)
+    angle = points[:, axis] / radius
+    r = radius + points[:, 2]
+    points[:, axis] = r * np.sin(angle)
+    points[:, 2] = r * np.cos(angle)
+    return points
+
+
+def wrap_sphere(points, radius):
+    """
+    Wrap the XY plane onto a sphere centered on the origin.
+
+    Distances from the z axis become arc lengths from the north pole, so the
+    mapping keeps lengths along lines through the origin (azimuthal equidistant).
+    z becomes the height above the sphere surface.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    x, y, z = points[:, 0], points[:, 1], points[:, 2]
+    polar = np.hypot(x, y) / radius
+    azimuth = np.arctan2(y, x)
+    r = radius + z
+    sin_polar = np.sin(polar)
+    return np.column_stack((
+        r * sin_polar * np.cos(azimuth),
+        r * sin_polar * np.sin(azimuth),
+        r * np.cos(polar),
+    ))
+
+
+def bend(points, radius, axis=0):
+    """
+    Bend the mesh along `axis` around a circle in the plane of `axis` and z.
+
+    The plane z = 0 is the neutral layer: its lengths are kept and the point at
+    the origin does not move. A positive radius bends the ends upward, a
+    negative one downward.
+    """
+    points = np.array(points, dtype=np.float64)
+    angle = points[:, axis] / radius
+    r = radius - points[:, 2]
+    points[:, axis] = r * np.sin(angle)
+    points[:, 2] = radius - r * np.cos(angle)
+    return points
+
+
+def twist(points, angle_per_unit, axis=2):
+    """
+    Rotate every point around `axis` by angle_per_unit times its coordinate
+    along that axis (radians per unit length).
+    """
+    points = np.array(points, dtype=np.float64)
+    u, v = [i for i in range(3) if i != axis]
+    angle = points[:, axis] * angle_per_unit
+    cos, sin = np.cos(angle), np.sin(angle)
+    pu, pv = points[:, u].copy(), points[:, v]
+    points[:, u] = cos * pu - sin * pv
+    points[:, v] = sin * pu + cos * pv
+    return points
+
+
+def taper(points, start_scale, end_scale, axis=2, start=None, end=None):
+    """
+    Scale the coordinates perpendicular to `axis` linearly along it.
+
+    Parameters:
+    - start_scale, end_scale: Scale factors at start and end.
+    - start, end: Range along the axis. Defaults to the extent of the points.
+      Points outside the range use the scale of the nearest end.
+    """
+    points = np.array(points, dtype=np.float64)
+    along = points[:, axis]
+    if start is None:
+        start = along.min()
+    if end is None:
+        end = along.max()
+    t = np.clip((along - start) / ((end - start) or 1.0), 0.0, 1.0)
+    factor = start_scale + (end_scale - start_scale) * t
+    for i in range(3):
+        if i != axis:
+            points[:, i] *= factor
+    return points
+
+
+def curve_onto_cylinder(points, radius, axis=1, move_axis=False, z_scale=0.5):
+    """
+    The mapping used for text on the snack box and the pencil case: only z
+    follows the cylinder, z' = radius * cos(u / radius) + z_scale * z, with u
+    the coordinate along `axis`. If move_axis is set, u also moves onto the
+    circle, u' = radius * sin(u / radius).
+    """
+    points = np.array(points, dtype=np.float64)
+    angle = points[:, axis] / radius
+    if move_axis:
+        points[:, axis] = radius * np.sin(angle)
+    points[:, 2] = radius * np.cos(angle) + points[:, 2] * z_scale
+    return points
+
+
+def _split_faces(faces, midpoints):
+    """
+    Split every face along the edges that have a midpoint vertex.
+
+    Parameters:
+    - faces: (n, 3) vertex ids. Local edge k runs from corner k to corner k + 1.
+    - midpoints: (n, 3) vertex id of the midpoint of each local edge, -1 if
+      the edge is not split.
+
+    Returns:
+    - (m, 3) faces. Since neighbouring faces share the midpoint of a shared
+      edge, the result has no T-junctions.
+    """
+    marked = midpoints >= 0
+    count = marked.sum(axis=1)
+    new_faces = [faces[count == 0]]
+
+    # One split edge: bisect from the opposite corner
+    one = count == 1
+    k = np.argmax(marked[one], axis=1)
+    order = (k[:, None] + np.arange(3)) % 3
+    a, b, c = np.take_along_axis(faces[one], order, axis=1).T
+    m = np.take_along_axis(midpoints[one], k[:, None], axis=1)[:, 0]
+    new_faces += [np.column_stack((a, m, c)), np.column_stack((m, b, c))]
+
+    # Two split edges: a corner triangle and a quad, rotated so edge c -> a
+    # is the unsplit one
+    two = count == 2
+    k = np.argmin(marked[two], axis=1)
+    order = (k[:, None] + np.arange(1, 4)) % 3
+    a, b, c = np.take_along_axis(faces[two], order, axis=1).T
+    m0, m1, _ = np.take_along_axis(midpoints[two], order, axis=1).T
+    new_faces += [
+        np.column_stack((m0, b, m1)),
+        np.column_stack((a, m0, m1)),
+        np.column_stack((a, m1, c)),
+    ]
+
+    # Three split edges: four similar triangles
+    three = count == 3
+    v0, v1, v2 = faces[three].T
+    m0, m1, m2 = midpoints[three].T
+    new_faces += [
+        np.column_stack((v0, m0, m2)),
+        np.column_stack((m0, v1, m1)),
+        np.column_stack((m2, m1, v2)),
+        np.column_stack((m0, m1, m2)),
+    ]
+    return np.concatenate(new_faces)
+
+
+def subdivide_for_deformer(mesh, deformer, tolerance, max_iterations=10, **params):
+    """
+    Subdivide a flat mesh where a deformer bends it, then deform it.
+
+    An edge is split at its midpoint if the deformed midpoint is more than
+    tolerance away from the middle of the deformed end points, i.e. where the
+    straight chord would visibly cut the curve. Faces are split along one, two
+    or three edges, so flat parts and edges along the bend axis keep their
+    triangles.
+
+    Parameters:
+    - mesh: trimesh.Trimesh in the flat (undeformed) space.
+    - deformer: A deformer from this module, or any function of (n, 3) points.
+    - tolerance: Largest allowed chord error after deforming.
+    - max_iterations: Upper bound on the number of splitting rounds.
+    - params: Keyword parameters for the deformer.
+
+    Returns:
+    - A new, deformed trimesh.Trimesh.
+    """
+    # Merge duplicated vertices so shared edges are split only once
+    mesh = trimesh.Trimesh(vertices=mesh.vertices, faces=mesh.faces)
+    vertices = np.asarray(mesh.vertices, dtype=np.float64)
+    faces = np.asarray(mesh.faces)
+    deformed = deformer(vertices, **params)
+
+    for _ in range(max_iterations):
+        edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        edges, face_edges = np.unique(edges, axis=0, return_inverse=True)
+        face_edges = face_edges.reshape(-1, 3)
+
+        midpoints = (vertices[edges[:, 0]] + vertices[edges[:, 1]]) / 2
+        deformed_midpoints = deformer(midpoints, **params)
+        chords = (deformed[edges[:, 0]] + deformed[edges[:, 1]]) / 2
+        split = np.linalg.norm(deformed_midpoints - chords, axis=1) > tolerance
+        if not split.any():
+            break
+
+        # New vertex ids for the split edges
+        edge_midpoint = np.full(len(edges), -1)
+        edge_midpoint[split] = len(vertices) + np.arange(split.sum())
+        vertices = np.concatenate((vertices, midpoints[split]))
+        deformed = np.concatenate((deformed, deformed_midpoints[split]))
+        faces = _split_faces(faces, edge_midpoint[face_edges])
+
+    return trimesh.Trimesh(vertices=deformed, faces=faces, process=False)
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import trimesh
+
+from mesh_cache import default_cache
+
+
+OPENSCAD = "openscad"
+DEFAULT_TIMEOUT = 300  # seconds per render
+
+
+class OpenSCADError(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def openscad_version():
+    # OpenSCAD prints its version to stderr
+    try:
+        result = subprocess.run([OPENSCAD, "--version"], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    return (result.stdout + result.stderr).strip()
+
+
+def render_scad(scad_code, timeout=DEFAULT_TIMEOUT, use_cache=True):
+    """
+    Render OpenSCAD code to a mesh.
+
+    Every job gets its own temporary directory for the .scad and .stl files,
+    so concurrent renders never overwrite each other. Results are kept in the
+    on-disk mesh cache, keyed by the code and the OpenSCAD version, so a
+    repeated render skips the subprocess.
+
+    Parameters:
+    - scad_code: OpenSCAD source, e.g. the output of solid.scad_render.
+    - timeout: Seconds before the openscad process is killed.
+    - use_cache: Look up and store the result in the default mesh cache.
+
+    Returns:
+    - A trimesh.Trimesh of the rendered geometry.
+    """
+    if not use_cache:
+        return _run_openscad(scad_code, timeout)
+
+    cache = default_cache()
+    key = cache.key(openscad_version(), scad_code)
+    mesh = cache.get(key)
+    if mesh is None:
+        mesh = _run_openscad(scad_code, timeout)
+        cache.put(key, mesh)
+    return mesh
+
+
+def _run_openscad(scad_code, timeout):
+    with tempfile.TemporaryDirectory(prefix="openscad_") as job_dir:
+        scad_path = os.path.join(job_dir, "model.scad")
+        stl_path = os.path.join(job_dir, "model.stl")
+        with open(scad_path, "w") as f:
+            f.write(scad_code)
+
+        try:
+            result = subprocess.run(
+                [OPENSCAD, "-o", stl_path, scad_path],
+                capture_output=True, text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            raise OpenSCADError(f"OpenSCAD did not finish within {timeout} seconds")
+        if result.returncode != 0 or not os.path.exists(stl_path):
+            raise OpenSCADError(f"OpenSCAD failed with exit code {result.returncode}:\n{result.stderr}")
+
+        return trimesh.load_mesh(stl_path)
+
+
+class OpenSCADPool:
+    """
+    A bounded pool of OpenSCAD workers with a sync and an asyncio API.
+
+    Usage:
+        with OpenSCADPool(max_workers=8) as pool:
+            meshes = pool.render_many(scad_codes)
+
+        meshes = await pool.render_many_async(scad_codes)
+    """
+
+    def __init__(self, max_workers=None, timeout=DEFAULT_TIMEOUT, use_cache=True):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.use_cache = use_cache
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="openscad")
+
+    def submit(self, scad_code):
+        # The worker threads only wait on the openscad subprocess
+        return self._executor.submit(render_scad, scad_code, self.timeout, self.use_cache)
+
+    def render(self, scad_code):
+        return self.submit(scad_code).result()
+
+    def render_many(self, scad_codes):
+        # Results come back in the order of scad_codes
+        futures = [self.submit(scad_code) for scad_code in scad_codes]
+        return [future.result() for future in futures]
+
+    async def render_async(self, scad_code):
+        return await asyncio.wrap_future(self.submit(scad_code))
+
+    async def render_many_async(self, scad_codes):
+        return await asyncio.gather(*(self.render_async(scad_code) for scad_code in scad_codes))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    # Shared pool for callers that do not manage their own
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = OpenSCADPool()
+    return _default_pool
@@ -0,0 +1,138 @@
+import functools
+import hashlib
+import inspect
+import time
+
+import numpy as np
+
+from mesh_cache import default_cache
+from tessellation import get_tolerance
+
+
+class PartStats:
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.build_seconds = 0.0
+
+    @property
+    def saved_seconds(self):
+        # Every hit saves about one average build
+        if self.misses == 0:
+            return 0.0
+        return (self.hits + self.disk_hits) * self.build_seconds / self.misses
+
+
+# Statistics of every cached part, by qualified function name
+_part_stats = {}
+
+
+def _normalize(value):
+    # Equal arguments give equal keys, whatever their type or spelling
+    if isinstance(value, (bool, str, bytes, type(None))):
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return 0.0 if value == 0 else float(f"{value:.12g}")
+    if isinstance(value, np.ndarray):
+        return tuple(_normalize(v) for v in value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    return repr(value)
+
+
+def _source_hash(func):
+    # Disk entries are invalidated when the function changes
+    try:
+        source = inspect.getsource(func).encode("utf-8")
+    except (OSError, TypeError):
+        source = func.__code__.co_code
+    return hashlib.sha256(source).hexdigest()
+
+
+def cached_part(func=None, *, disk=False):
+    """
+    Decorator that memoizes a function building a trimesh part.
+
+    Arguments are bound to the signature with defaults applied and normalized,
+    so create_bolt(10, 4), create_bolt(10.0, cap_thickness=4) and
+    create_bolt(10, 4, 0) share one entry. The key also includes the
+    tessellation tolerance. Every call returns a copy, so callers are free
+    to transform the result in place.
+
+    Parameters:
+    - disk: Also keep the parts in the on-disk mesh cache, keyed by the
+      arguments and the source code of the function.
+
+    Usage:
+        @cached_part
+        def create_bolt(height, cap_thickness, cutout_adj=0):
+            ...
+    """
+    if func is None:
+        return functools.partial(cached_part, disk=disk)
+
+    name = f"{func.__module__}.{func.__qualname__}"
+    signature = inspect.signature(func)
+    source_hash = _source_hash(func) if disk else None
+    stats = _part_stats.setdefault(name, PartStats(name))
+    parts = {}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        # Parts depend on the tessellation tolerance as well as the arguments
+        key = (_normalize(bound.arguments), get_tolerance())
+
+        mesh = parts.get(key)
+        if mesh is not None:
+            stats.hits += 1
+            return mesh.copy()
+
+        if disk:
+            disk_key = default_cache().key(name, source_hash, key)
+            mesh = default_cache().get(disk_key)
+            if mesh is not None:
+                stats.disk_hits += 1
+
+        if mesh is None:
+            start = time.time()
+            mesh = func(*args, **kwargs)
+            stats.build_seconds += time.time() - start
+            stats.misses += 1
+            if disk:
+                default_cache().put(disk_key, mesh)
+
+        # The stored part is shared between calls, so keep it read-only
+        mesh.vertices.flags.writeable = False
+        mesh.faces.flags.writeable = False
+        parts[key] = mesh
+        return mesh.copy()
+
+    def cache_clear():
+        parts.clear()
+
+    wrapper.cache_clear = cache_clear
+    wrapper.stats = stats
+    return wrapper
+
+
+def part_stats():
+    return dict(_part_stats)
+
+
+def print_part_stats():
+    # One line per part with how often it was reused and the time that saved
+    for stats in _part_stats.values():
+        if stats.hits + stats.disk_hits + stats.misses == 0:
+            continue
+        print(
+            f"{stats.name}: {stats.misses} built in {stats.build_seconds:.2f} s, "
+            f"{stats.hits} memory hits, {stats.disk_hits} disk hits, "
+            f"about {stats.saved_seconds:.2f} s saved"
+        )
@@ -0,0 +1,300 @@
+import numpy as np
+import trimesh
+from shapely import get_coordinates, line_interpolate_point
+from shapely.geometry import LinearRing, Point, Polygon, MultiPolygon, box
+from shapely.geometry.polygon import orient
+from shapely.ops import unary_union
+
+from tessellation import get_tolerance, segments_for_radius
+
+
+# 2D shapes are plain shapely geometries, built and combined here and turned
+# into meshes in one step with extrude() or revolve(). A planar part is then a
+# single polygon triangulation instead of a chain of 3D booleans:
+#
+#     plate = difference(rounded_rectangle(100, 60, 5), circle(4, (40, 20)))
+#     mesh = extrude(plate, 3)
+
+
+def corner_segments(radius):
+    # Segments per quarter circle of radius, as shapely counts them, from the
+    # tessellation tolerance
+    return max(1, int(np.ceil(segments_for_radius(abs(radius)) / 4)))
+
+
+def rectangle(length, width, center=(0, 0)):
+    x, y = center
+    return box(x - length / 2, y - width / 2, x + length / 2, y + width / 2)
+
+
+def rounded_rectangle(length, width, radius, center=(0, 0), segments=None):
+    """
+    Rectangle of length (x) by width (y) with corners rounded to radius.
+
+    Parameters:
+    - segments: Segments per corner, from the tessellation tolerance if None.
+      Outlines with the same segments have the same number of vertices, so a
+      loft pairs them vertex by vertex.
+    """
+    if radius <= 0:
+        return rectangle(length, width, center)
+    core = rectangle(length - 2 * radius, width - 2 * radius, center)
+    return core.buffer(radius, quad_segs=segments or corner_segments(radius))
+
+
+def circle(radius, center=(0, 0)):
+    return Point(center).buffer(radius, quad_segs=corner_segments(radius))
+
+
+def polygon(shell, holes=None):
+    """
+    Polygon from a list of (x, y) points, with optional holes given as lists
+    of points as well.
+    """
+    return Polygon(shell, holes)
+
+
+def offset(shape, distance, join="round"):
+    """
+    Grow (distance > 0) or shrink (distance < 0) a shape.
+
+    Parameters:
+    - join: "round", "mitre" or "bevel" corners.
+    """
+    return shape.buffer(distance, quad_segs=corner_segments(distance), join_style=join)
+
+
+def union(*shapes):
+    return unary_union(shapes)
+
+
+def difference(shape, *cutters):
+    return shape.difference(unary_union(cutters))
+
+
+def intersection(shape, *others):
+    for other in others:
+        shape = shape.intersection(other)
+    return shape
+
+
+def _polygons(shape):
+    if isinstance(shape, Polygon):
+        return [] if shape.is_empty else [shape]
+    if isinstance(shape, MultiPolygon):
+        return list(shape.geoms)
+    # Collections from booleans may hold lines or points as well
+    return [geom for geom in getattr(shape, "geoms", []) if isinstance(geom, Polygon) and not geom.is_empty]
+
+
+def extrude(shape, height, z=0.0):
+    """
+    Extrude a shape along z, from z to z + height.
+
+    Each polygon (with its holes) is triangulated once; separate polygons
+    become separate bodies of one mesh.
+    """
+    polygons = _polygons(shape)
+    if not polygons:
+        raise ValueError("Nothing to extrude")
+    mesh = trimesh.util.concatenate([trimesh.creation.extrude_polygon(poly, height) for poly in polygons])
+    mesh.apply_translation([0, 0, z])
+    return mesh
+
+
+def revolve(shape, angle=2 * np.pi, sections=None):
+    """
+    Revolve a shape drawn in the (radius, z) plane around the z axis.
+
+    The shape must lie at x >= 0. Holes in the shape become cavities.
+
+    Parameters:
+    - angle: Sweep angle in radians, a full turn by default.
+    - sections: Number of steps around the axis, from the tessellation
+      tolerance if None.
+    """
+    polygons = _polygons(shape)
+    if not polygons:
+        raise ValueError("Nothing to revolve")
+    if sections is None:
+        sections = segments_for_radius(max(poly.bounds[2] for poly in polygons))
+    sections = max(3, int(np.ceil(sections * angle / (2 * np.pi))))
+
+    meshes = []
+    for poly in polygons:
+        # Counter-clockwise outlines revolve to outward faces, clockwise holes to inward ones
+        poly = orient(poly, 1.0)
+        for ring in [poly.exterior, *poly.interiors]:
+            meshes.append(trimesh.creation.revolve(np.array(ring.coords), angle=angle, sections=sections))
+
+        if not np.isclose(angle, 2 * np.pi):
+            # Close both ends with the triangulated shape
+            vertices, faces = trimesh.creation.triangulate_polygon(poly)
+            start = np.column_stack((vertices[:, 0], np.zeros(len(vertices)), vertices[:, 1]))
+            rotation = trimesh.transformations.rotation_matrix(angle, [0, 0, 1])
+            end = trimesh.transform_points(start, rotation)
+            meshes.append(trimesh.Trimesh(vertices=start, faces=faces, process=False))
+            meshes.append(trimesh.Trimesh(vertices=end, faces=faces[:, ::-1], process=False))
+
+    mesh = trimesh.util.concatenate(meshes)
+    mesh.merge_vertices()
+    return mesh
+
+
+def _exterior(shape):
+    # Outer ring of the first polygon, counter-clockwise, without the closing point
+    return np.array(orient(_polygons(shape)[0], 1.0).exterior.coords)[:-1]
+
+
+def _ring_vertices(shape):
+    """
+    The vertices of the outline of a shape, counter-clockwise, starting at the
+    first one at or after the +x direction from its centroid. Outlines built
+    the same way (e.g. rounded rectangles with the same segments) line up
+    vertex by vertex.
+    """
+    points = _exterior(shape)
+    center = np.array(Polygon(points).centroid.coords[0])
+    angles = np.mod(np.arctan2(*(points - center).T[::-1]) + 1e-9, 2 * np.pi)
+    return np.roll(points, -int(np.argmin(angles)), axis=0)
+
+
+def _ring_points(shape, count):
+    """
+    Resample the outline of a shape to count points, evenly spaced along its
+    length and counter-clockwise, starting where it crosses the +x direction
+    from its centroid. Outlines resampled this way line up point by point.
+    """
+    ring = LinearRing(_exterior(shape))
+    center = ring.centroid
+    start = ring.project(Point(center.x + 10 * ring.length, center.y))
+    distances = (start + np.linspace(0, ring.length, count, endpoint=False)) % ring.length
+    return get_coordinates(line_interpolate_point(ring, distances))
+
+
+def _max_turn(points):
+    # Largest change of direction at a vertex of a closed outline, in radians
+    before = points - np.roll(points, 1, axis=0)
+    after = np.roll(points, -1, axis=0) - points
+    return np.abs(np.arctan2(before[:, 0] * after[:, 1] - before[:, 1] * after[:, 0], np.einsum("ij,ij->i", before, after))).max()
+
+
+def _loft_count(outlines, tolerance=None):
+    """
+    Points per outline for a loft: None when all outlines already have the
+    same number of vertices, which are then paired directly. Otherwise the
+    longest perimeter divided by the chord length for the tolerance.
+
+    A chord of length c that cuts off a vertex turning by an angle t stays
+    within c * sin(t) / 4 of it, so the chord is sized for half the
+    tolerance at the sharpest vertex.
+    """
+    rings = [_exterior(shape) for shape in outlines]
+    if len({len(ring) for ring in rings}) <= 1:
+        return None
+    tolerance = get_tolerance() if tolerance is None else tolerance
+    turn = min(np.pi / 2, max(_max_turn(ring) for ring in rings))
+    chord = 2 * tolerance / np.sin(turn)
+    perimeter = max(LinearRing(ring).length for ring in rings)
+    return max(max(len(ring) for ring in rings), int(np.ceil(perimeter / chord)))
+
+
+def _loft_rings(outlines, heights, count):
+    # With count None the outline vertices are paired directly
+    if len(outlines) != len(heights) or len(outlines) < 2:
+        raise ValueError("A loft needs at least two outlines, each with a height")
+    rings = [_ring_vertices(shape) if count is None else _ring_points(shape, count) for shape in outlines]
+    return np.stack([np.column_stack((ring, np.full(len(ring), z))) for ring, z in zip(rings, heights)])
+
+
+def _side_faces(first, rings, count, inward=False):
+    # Quads between consecutive rings, numbered from vertex id first
+    i = np.arange(count)
+    k = np.arange(rings - 1)[:, None]
+    a = first + k * count + i
+    a_next = first + k * count + (i + 1) % count
+    b, b_next = a + count, a_next + count
+    faces = np.concatenate((
+        np.stack((a, a_next, b_next), axis=-1).reshape(-1, 3),
+        np.stack((a, b_next, b), axis=-1).reshape(-1, 3),
+    ))
+    return faces[:, ::-1] if inward else faces
+
+
+def _cap_faces(first, center, count, up):
+    # Fan from a center vertex, facing +z if up
+    i = np.arange(count)
+    faces = np.column_stack((np.full(count, center), first + i, first + (i + 1) % count))
+    return faces if up else faces[:, ::-1]
+
+
+def loft(outlines, heights, count=None):
+    """
+    Connect a sequence of outlines at increasing heights into a closed solid.
+
+    Every outline is resampled to the same number of points, so consecutive
+    outlines are joined by a single band of quads. The ends are closed with
+    fans, so outlines must be star-shaped around their centroid (e.g. rounded
+    rectangles).
+
+    Parameters:
+    - outlines: List of shapes, from bottom to top.
+    - heights: z of every outline.
+    - count: Points per outline. If None, outlines with the same number of
+      vertices are paired directly and others are resampled finely enough
+      for the tessellation tolerance.
+    """
+    if count is None:
+        count = _loft_count(outlines)
+    rings = _loft_rings(outlines, heights, count)
+    layers, count = rings.shape[:2]
+    vertices = np.vstack((rings.reshape(-1, 3), rings[0].mean(axis=0), rings[-1].mean(axis=0)))
+    bottom_center, top_center = len(vertices) - 2, len(vertices) - 1
+    faces = np.vstack((
+        _side_faces(0, layers, count),
+        _cap_faces(0, bottom_center, count, up=False),
+        _cap_faces((layers - 1) * count, top_center, count, up=True),
+    ))
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+
+def loft_shell(outer_outlines, outer_heights, inner_outlines, inner_heights, count=None):
+    """
+    Loft an open-topped container: an outer solid with a cavity lofted from
+    the inner outlines, joined by a flat rim at the top.
+
+    The last inner outline must be at the same height as the last outer one.
+    The cavity floor is at the first inner height. Everything comes out as one
+    watertight mesh without booleans.
+    """
+    if not np.isclose(outer_heights[-1], inner_heights[-1]):
+        raise ValueError("The inner and outer outlines must end at the same height")
+    if count is None:
+        # Outer and inner outlines need the same count for the rim
+        count = _loft_count(list(outer_outlines) + list(inner_outlines))
+    outer = _loft_rings(outer_outlines, outer_heights, count)
+    inner = _loft_rings(inner_outlines, inner_heights, count)
+    outer_layers, inner_layers = len(outer), len(inner)
+    count = outer.shape[1]
+
+    inner_first = outer_layers * count
+    vertices = np.vstack((outer.reshape(-1, 3), inner.reshape(-1, 3), outer[0].mean(axis=0), inner[0].mean(axis=0)))
+    bottom_center, floor_center = len(vertices) - 2, len(vertices) - 1
+
+    # The rim joins the top outer ring to the top inner ring, facing up
+    i = np.arange(count)
+    outer_top = (outer_layers - 1) * count + i
+    inner_top = inner_first + (inner_layers - 1) * count + i
+    rim = np.concatenate((
+        np.column_stack((outer_top, np.roll(outer_top, -1), np.roll(inner_top, -1))),
+        np.column_stack((outer_top, np.roll(inner_top, -1), inner_top)),
+    ))
+
+    faces = np.vstack((
+        _side_faces(0, outer_layers, count),
+        _cap_faces(0, bottom_center, count, up=False),
+        _side_faces(inner_first, inner_layers, count, inward=True),
+        _cap_faces(inner_first, floor_center, count, up=True),
+        rim,
+    ))
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
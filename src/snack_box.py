@@ -3,6 +3,8 @@ import numpy as np
 
 from threaded_cylinder import create_threaded_cylinder, flip_z
 import text3d_utils
+from assembly import Assembly
+from utils import batch_difference
 
 tolerance = 0.5
 
@@ -37,10 +39,10 @@ def create_plain_threaded_cap(inner_radius=inch_to_mm(1.5), thread_height=5, wal
     cap = flip_z(cap)
     return cap
 
-def add_text_to_bottom(text_string, text_size, text_height, outer_radius, text_pos, bottom_mesh):
+def add_text_to_bottom(text_string, text_size, text_height, outer_radius, text_pos, bottom_mesh, tolerance=0.01):
     text = text3d_utils.text_3d(text_string, text_size, text_height)
     text_mesh = text3d_utils.text_3d_mesh(text, text_height)
-    curved_mesh = text3d_utils.curve_mesh_onto_cylinder_along_z(text_mesh, outer_radius)
+    curved_mesh = text3d_utils.curve_mesh_onto_cylinder_along_z(text_mesh, outer_radius, tolerance=tolerance)
     rotation_matrix = trimesh.transformations.rotation_matrix(
         angle=np.pi / 2,         # 90 degrees in radians
         direction=[1, 0, 0],     # Rotation around the y-axis
@@ -71,15 +73,18 @@ def cut_bottom_for_better_grip(cut_thickness, cut_layers, cut_num, outer_radius,
 
     delta_angle = np.pi * 2 / cut_num
     off_set_angle = delta_angle / 2
+    positions = []
     for jj in range(cut_layers):
         z_pos = bottom_height - cut_thickness - jj * cut_thickness
         offset = off_set_angle * jj
         for ii in range(cut_num):
             x_pos = outer_radius * np.cos(ii * delta_angle + offset)
             y_pos = outer_radius * np.sin(ii * delta_angle + offset)
-            cut = cut_box.copy()
-            cut = cut.apply_translation([x_pos, y_pos, z_pos])
-            bottom_mesh = bottom_mesh.difference(cut)
+            positions.append([x_pos, y_pos, z_pos])
+
+    # One cut box placed at every position, subtracted in a single boolean
+    cuts = Assembly.from_translations(cut_box, positions, name="grip_cut")
+    bottom_mesh, _ = batch_difference(bottom_mesh, cuts.instances())
     return bottom_mesh
 
 
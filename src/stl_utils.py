@@ -0,0 +1,71 @@
+import os
+import struct
+
+import numpy as np
+
+
+# Record layout of one triangle in a binary STL file
+STL_TRIANGLE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attributes", "<u2"),
+])
+
+
+class StreamingSTLWriter:
+    """
+    Write a binary STL file incrementally, one batch of triangles at a time.
+
+    The header is written with a triangle count of 0 and patched when the
+    writer is closed, so only the current batch is ever held in memory.
+
+    Usage:
+        with StreamingSTLWriter("~/Downloads/model.stl") as writer:
+            for triangles in batches:
+                writer.write_triangles(triangles)
+    """
+
+    def __init__(self, path, header="python3d streaming STL"):
+        self.path = os.path.expanduser(path)
+        self.count = 0
+        self.file = open(self.path, "wb")
+        self.file.write(header.encode("ascii")[:80].ljust(80, b"\0"))
+        self.file.write(struct.pack("<I", 0))
+
+    def write_triangles(self, triangles):
+        """
+        Append triangles to the file.
+
+        Parameters:
+        - triangles: (n, 3, 3) array of triangle corners, counter-clockwise
+          seen from outside.
+        """
+        triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+        if len(triangles) == 0:
+            return
+        normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+        records = np.zeros(len(triangles), dtype=STL_TRIANGLE)
+        records["normal"] = normals
+        records["vertices"] = triangles
+        self.file.write(records.tobytes())
+        self.count += len(triangles)
+
+    def write_mesh(self, mesh):
+        self.write_triangles(mesh.triangles)
+
+    def close(self):
+        if self.file.closed:
+            return
+        # Patch the triangle count in the header
+        self.file.seek(80)
+        self.file.write(struct.pack("<I", self.count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
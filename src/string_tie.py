@@ -1,5 +1,6 @@
 import trimesh
 import numpy as np
+from tessellation import segments_for_radius
 
 def create_string_tie(a, b):
     # Step 1: Create the first box with dimensions a x b x b, centered at (0, 0, 0)
@@ -10,8 +11,8 @@ def create_string_tie(a, b):
     box_2.apply_translation([a / 2 + b / 2, 0, 0])  # Move it to the correct position
     
     # Step 3: Create the ring (donut shape) with inner_radius=b/2 and outer_radius=b
-    outer_cylinder = trimesh.primitives.Cylinder(radius=b * 1.5, height=b, sections=64)
-    inner_cylinder = trimesh.primitives.Cylinder(radius=b, height=b, sections=64)
+    outer_cylinder = trimesh.primitives.Cylinder(radius=b * 1.5, height=b, sections=segments_for_radius(b * 1.5))
+    inner_cylinder = trimesh.primitives.Cylinder(radius=b, height=b, sections=segments_for_radius(b))
     
     # Subtract the inner cylinder from the outer cylinder to create the ring
     ring = outer_cylinder.difference(inner_cylinder)
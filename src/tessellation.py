@@ -0,0 +1,73 @@
+import math
+from contextlib import contextmanager
+
+import trimesh
+
+
+# Largest allowed distance in mm between a circle and the chords approximating it
+PRESETS = {
+    "draft": 0.05,
+    "final": 0.01,
+}
+MIN_SEGMENTS = 8
+MAX_SEGMENTS = 720
+
+_tolerance = PRESETS["final"]
+
+
+def set_tessellation(tolerance):
+    """
+    Set the global chord tolerance.
+
+    Parameters:
+    - tolerance: A preset name ("draft" or "final") or a distance in mm.
+    """
+    global _tolerance
+    _tolerance = float(PRESETS.get(tolerance, tolerance))
+
+
+def get_tolerance():
+    return _tolerance
+
+
+@contextmanager
+def tessellation(tolerance):
+    # Temporarily switch the tolerance, e.g. with tessellation("draft"): ...
+    previous = _tolerance
+    set_tessellation(tolerance)
+    try:
+        yield
+    finally:
+        set_tessellation(previous)
+
+
+def segments_for_radius(radius, tolerance=None):
+    """
+    Number of segments for a full circle so that no chord is further than the
+    tolerance from the circle: the sagitta r * (1 - cos(pi / n)) <= tolerance.
+
+    Parameters:
+    - radius: Radius of the circle in mm.
+    - tolerance: Chord tolerance in mm, the global one if None.
+    """
+    tolerance = _tolerance if tolerance is None else tolerance
+    if radius <= tolerance:
+        return MIN_SEGMENTS
+    segments = math.ceil(math.pi / math.acos(1 - tolerance / radius))
+    return max(MIN_SEGMENTS, min(MAX_SEGMENTS, segments))
+
+
+def cylinder(radius, height, **kwargs):
+    # trimesh.creation.cylinder with the number of sections from the policy
+    return trimesh.creation.cylinder(radius=radius, height=height, sections=segments_for_radius(radius), **kwargs)
+
+
+def torus(major_radius, minor_radius, **kwargs):
+    # trimesh.creation.torus with both section counts from the policy
+    return trimesh.creation.torus(
+        major_radius=major_radius,
+        minor_radius=minor_radius,
+        major_sections=segments_for_radius(major_radius + minor_radius),
+        minor_sections=segments_for_radius(minor_radius),
+        **kwargs
+    )
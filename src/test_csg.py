@@ -0,0 +1,44 @@
+import numpy as np
+import trimesh
+
+import csg
+
+
+def test_shared_union_is_evaluated_once():
+    case = csg.leaf(trimesh.creation.box([10, 10, 10])) | trimesh.creation.box([3, 3, 20])
+    cutter = trimesh.creation.box([100, 100, 100])
+    cutter.apply_translation([0, 0, 52])
+    bottom = (case - cutter).translate([0, 0, -1.4])
+    whole = case | bottom
+
+    unions = [step for step in whole.plan() if step["op"] == "union"]
+    # The shared case union is a step of its own, used by both branches
+    assert case.key in [step["key"] for step in unions]
+    assert all(case.key in step["operands"] for step in unions if step["key"] == whole.key)
+    assert len(unions) == 2
+
+
+def test_unshared_unions_and_differences_merge():
+    box = trimesh.creation.box([10, 10, 10])
+    rods = [trimesh.creation.box([20, 1, 1]), trimesh.creation.box([1, 20, 1])]
+    union = csg.leaf(box) | rods[0] | rods[1]
+    difference = csg.leaf(box) - rods[0] - rods[1]
+    assert sum(step["boolean"] for step in union.plan()) == 1
+    assert sum(step["boolean"] for step in difference.plan()) == 1
+    assert np.isclose(difference.evaluate().volume, 1000 - 2 * 10 + 1)
+
+
+def test_meshes_on_the_left():
+    box = trimesh.creation.box([10, 10, 10])
+    cylinder = csg.leaf(trimesh.creation.cylinder(2, 20))
+    assert isinstance(box | cylinder, csg.Union)
+    assert isinstance(box - cylinder, csg.Difference)
+    assert isinstance(box & cylinder, csg.Intersection)
+
+
+def test_far_cutters_are_pruned():
+    far = trimesh.creation.box([1, 1, 1])
+    far.apply_translation([100, 0, 0])
+    difference = csg.leaf(trimesh.creation.box([10, 10, 10])) - far
+    assert difference.plan()[-1]["pruned"] == 1
+    assert not difference.plan()[-1]["boolean"]
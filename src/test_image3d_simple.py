@@ -0,0 +1,16 @@
+import numpy as np
+
+import image3d_simple
+
+
+def test_greedy_meshing_reports_saved_triangles():
+    matrix = np.zeros((6, 8), dtype=int)
+    matrix[1:5, 1:7] = 1
+    pixels = image3d_simple.create_extruded_mesh(matrix, 8, 6, 2)
+    merged = image3d_simple.create_extruded_mesh(matrix, 8, 6, 2, merge_faces=True)
+    assert merged.is_watertight
+    assert np.isclose(merged.volume, pixels.volume)
+    assert "triangles_saved" not in pixels.metadata
+    assert merged.metadata["pixel_triangles"] == len(pixels.faces)
+    assert merged.metadata["triangles_saved"] == len(pixels.faces) - len(merged.faces)
+    assert merged.metadata["triangles_saved"] > 0
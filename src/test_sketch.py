@@ -0,0 +1,45 @@
+import numpy as np
+import shapely
+import trimesh
+from shapely.geometry import Polygon
+
+import hand_bag
+import sketch
+from tessellation import get_tolerance
+
+
+def section(mesh, z):
+    # Cross section of a convex loft at height z, as a polygon
+    points = trimesh.intersections.mesh_plane(mesh, [0, 0, 1], [0, 0, z]).reshape(-1, 3)[:, :2]
+    angles = np.arctan2(*(points - points.mean(axis=0)).T[::-1])
+    return Polygon(points[np.argsort(angles)])
+
+
+def deviation(shape, other):
+    return shapely.hausdorff_distance(shape.exterior, other.exterior, densify=0.01)
+
+
+def test_loft_pairs_matching_outlines():
+    bottom = sketch.rounded_rectangle(100, 60, 10, segments=8)
+    top = sketch.rounded_rectangle(110, 66, 12, segments=8)
+    mesh = sketch.loft([bottom, top], [0, 10])
+    assert mesh.is_watertight
+    # Rounded rectangles interpolate exactly between paired vertices
+    middle = sketch.rounded_rectangle(105, 63, 11, segments=8)
+    assert deviation(section(mesh, 5), middle) < 1e-6
+
+
+def test_loft_resampled_outlines_stay_within_tolerance():
+    bottom = sketch.rounded_rectangle(100, 60, 10)
+    top = sketch.rounded_rectangle(110, 66, 3)
+    mesh = sketch.loft([bottom, top], [0, 10])
+    assert mesh.is_watertight
+    assert deviation(section(mesh, 1e-6), bottom) <= get_tolerance()
+    assert deviation(section(mesh, 10 - 1e-6), top) <= get_tolerance()
+
+
+def test_bag_keeps_rounded_corners():
+    bag = hand_bag.create_a_bag_smooth(180, 100, 10, 5, 2.5, 150, l_taper_rate=1.2, w_taper_rate=1.2)
+    assert bag.is_watertight
+    base = sketch.rounded_rectangle(180, 100, 10)
+    assert deviation(section(bag, 1.0), base) <= get_tolerance()
@@ -0,0 +1,24 @@
+import numpy as np
+
+import threaded_cylinder
+from tessellation import get_tolerance
+
+
+def test_offset_radius_table_stays_within_tolerance():
+    pitch, clearance = 0.7, 0.2
+    male = threaded_cylinder._radius_table(10, 1, "iso")
+    female = threaded_cylinder._offset_radius_table(male, pitch, clearance)
+    # The offset outline from a denser sweep of the disk
+    u = np.linspace(0, pitch / 2, 2001)
+    dz = np.linspace(-clearance, clearance, 1001)
+    phase = np.abs(((u[:, None] + dz) / pitch + 0.5) % 1.0 - 0.5)
+    offset = (np.interp(phase, male[:, 0], male[:, 1]) + np.sqrt(clearance ** 2 - dz ** 2)).max(axis=1)
+    deviation = np.interp(u / pitch, female[:, 0], female[:, 1]) - offset
+    assert deviation.min() > -1e-3
+    assert deviation.max() <= get_tolerance()
+
+
+def test_thread_pair_keeps_the_clearance():
+    male, female, min_gap = threaded_cylinder.create_thread_pair(10, 4, 1, 2, clearance=0.3, profile="iso")
+    assert male.is_watertight and female.is_watertight
+    assert abs(min_gap - 0.3) < 1e-3
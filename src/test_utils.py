@@ -0,0 +1,20 @@
+import trimesh
+
+from utils import overlapping_groups
+
+
+def box_at(x, y, z):
+    return trimesh.creation.box([1, 1, 1]).apply_translation([x, y, z])
+
+
+def test_overlapping_groups_follow_chains_of_boxes():
+    meshes = [
+        box_at(0, 0, 0),
+        box_at(5, 0, 0),
+        box_at(0.5, 0, 0),
+        box_at(1.5, 0, 0),   # touches the box at 0.5, so joins the first group
+        box_at(0, 0, 3),     # above the first box, apart in z only
+        box_at(5.5, 0.5, 0.5),
+    ]
+    assert overlapping_groups(meshes) == [[0, 2, 3], [1, 5], [4]]
+    assert overlapping_groups([]) == []
@@ -2,12 +2,14 @@ import trimesh
 from trimesh.creation import box
 from solid import text, linear_extrude, scad_render
 import os
-import subprocess
-from shapely.geometry import Polygon, MultiLineString
-from shapely.affinity import rotate as shapely_rotate, translate as shapely_translate
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
-from trimesh.creation import extrude_polygon
+import re
+import csv
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from openscad_utils import render_scad
+from keyring_utils import create_key_ring_loop
+from text3d_utils import glyph_text_mesh
 import numpy as np
 
 # Define the output directory
@@ -20,75 +22,57 @@ text_height = 1  # Height of the text
 sign_borders = 3
 board_thickness = 2
 
-def create_key_ring_loop(inner_radius=1.2, tube_radius=0.1, segments=64):
-    """
-    Create a key ring loop (torus) to attach to the bat.
-
-    Parameters:
-    - inner_radius: The distance from the center of the torus to the center of the tube.
-    - tube_radius: The radius of the tube.
-    - segments: The number of segments for the torus mesh.
-
-    Returns:
-    - A Trimesh object representing the key ring loop.
-    """
-    # Create the torus (ring)
-    key_ring = trimesh.creation.torus(
-        # sections=segments,
-        sections_minor=segments // 2,
-        major_radius=inner_radius,
-        minor_radius=tube_radius
-    )
-    return key_ring
-
 # Function to generate text as 3D geometry using OpenSCAD
 def text_3d(text_string, size, height):
     return linear_extrude(height=height)(text(text_string, size=size, valign="center", halign="center"))
 
-# Generate the text geometry
-text_geom = text_3d(text_string, font_size, text_height)
+def create_text_mesh(text_string, in_process=False):
+    if in_process:
+        # Assemble the text from cached glyph meshes, without OpenSCAD
+        return glyph_text_mesh(text_string, font_size, text_height)
 
-# Render the text geometry to an OpenSCAD string
-scad_code = scad_render(text_geom)
+    # Generate the text geometry
+    text_geom = text_3d(text_string, font_size, text_height)
 
-# Path for the OpenSCAD file
-scad_path = os.path.join(output_dir, 'text.scad')
+    # Render the text geometry to an OpenSCAD string
+    scad_code = scad_render(text_geom)
 
-# Write the OpenSCAD string to a file
-with open(scad_path, 'w') as f:
-    f.write(scad_code)
+    # Convert it to a mesh in a private temporary directory
+    return render_scad(scad_code)
 
-# Convert the OpenSCAD file to STL using OpenSCAD command line
-stl_path_text = os.path.join(output_dir, 'text.stl')
-subprocess.run(['openscad', '-o', stl_path_text, scad_path])
-
-# Load the text geometry from the generated STL file
-text_mesh = trimesh.load_mesh(stl_path_text)
+def create_keychain(text_string, in_process=False):
+    """
+    Build a keychain: the text on a board sized to fit it, with a key ring loop.
 
-# Center the text on the board
-text_bounds = text_mesh.bounding_box.extents
-text_translation = [
-    0,
-    0,
-    board_thickness / 2
-]
-text_mesh.apply_translation(text_translation)
+    Parameters:
+    - text_string: Text on the keychain.
+    - in_process: Render the text from glyph meshes instead of OpenSCAD.
 
-# Create the board
-board = box(extents=[text_bounds[0] + 8 * sign_borders, text_bounds[1] + 2 * sign_borders, board_thickness])
+    Returns:
+    - The keychain as a trimesh.Trimesh.
+    """
+    text_mesh = create_text_mesh(text_string, in_process)
 
+    # Center the text on the board
+    text_bounds = text_mesh.bounding_box.extents
+    text_translation = [
+        0,
+        0,
+        board_thickness / 2
+    ]
+    text_mesh.apply_translation(text_translation)
 
-# Combine the board and the text
-model = board.union(text_mesh)
+    # Create the board
+    board = box(extents=[text_bounds[0] + 8 * sign_borders, text_bounds[1] + 2 * sign_borders, board_thickness])
 
-key_ring = create_key_ring_loop(
+    # The torus is built once and copied for every keychain
+    key_ring = create_key_ring_loop(
         inner_radius=2,  # Slightly larger than the knob radius
-        tube_radius=1,
-        segments=64
+        tube_radius=1
     )
 
     # Align the key ring loop perpendicular to the bat
-key_ring.apply_transform(
+    key_ring.apply_transform(
         trimesh.transformations.rotation_matrix(
             angle=np.radians(90),
             direction=[0, 0, 1],
@@ -97,17 +81,73 @@ key_ring.apply_transform(
     )
 
     # Position the key ring loop at the end of the knob
-key_ring.apply_translation([
+    key_ring.apply_translation([
         board.bounds[0][0] - key_ring.extents[0] / 2 + 1,  # Slightly beyond the knob
         0,
         0
     ])
 
-model = model.union(key_ring)
+    # Combine the board, the text and the key ring in one boolean
+    return trimesh.boolean.union([board, text_mesh, key_ring])
+
+def read_names(csv_path):
+    # Names are taken from a "name" column, or the first column if there is no such header
+    with open(os.path.expanduser(csv_path), newline='') as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "name" in header:
+        column = header.index("name")
+        return [row[column].strip() for row in rows[1:] if len(row) > column and row[column].strip()]
+    return [row[0].strip() for row in rows]
+
+def keychain_file_name(index, name):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_') or 'keychain'
+    return f'{index:04d}_{slug}.stl'
+
+def _build_and_export(job):
+    name, stl_path = job
+    create_keychain(name, in_process=True).export(stl_path)
+    return stl_path
+
+def create_keychains_from_csv(csv_path, output_dir=output_dir, max_workers=None):
+    """
+    Build one keychain per name in a CSV file, across a process pool.
 
-# model.show()
-# Path for the output STL file
-stl_path = os.path.join(output_dir, 'text_on_board_keychain.stl')
+    Parameters:
+    - csv_path: CSV file with a "name" column, or names in the first column.
+    - output_dir: Directory for the STL files, one per name.
+    - max_workers: Number of worker processes, all CPUs if None.
 
-# Export to STL
-model.export(stl_path)
+    Returns:
+    - List of the STL paths, in the order of the names.
+    """
+    names = read_names(csv_path)
+    output_dir = os.path.expanduser(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(name, os.path.join(output_dir, keychain_file_name(i, name))) for i, name in enumerate(names)]
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # Every worker keeps its own glyph and key ring caches between jobs
+        stl_paths = list(executor.map(_build_and_export, jobs, chunksize=4))
+    elapsed = time.time() - start
+
+    rate = len(stl_paths) / elapsed * 60 if elapsed > 0 else float('inf')
+    print(f"Built {len(stl_paths)} keychains in {elapsed:.1f} s ({rate:.0f} keychains per minute)")
+    return stl_paths
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # python text3d_keychain.py names.csv [output_dir]
+        create_keychains_from_csv(sys.argv[1], *sys.argv[2:3])
+    else:
+        model = create_keychain(text_string)
+
+        # model.show()
+        # Path for the output STL file
+        stl_path = os.path.join(output_dir, 'text_on_board_keychain.stl')
+
+        # Export to STL
+        model.export(stl_path)
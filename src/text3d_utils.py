@@ -1,31 +1,48 @@
 import trimesh
-from trimesh.creation import box
+from trimesh.creation import box, extrude_polygon
 from solid import text, linear_extrude, scad_render
 import os
-import subprocess
+from openscad_utils import render_scad, default_pool
 import numpy as np
+from mesh_deformers import deform, curve_onto_cylinder, subdivide_for_deformer
+from functools import lru_cache
+from shapely.geometry import Polygon
+from matplotlib.textpath import TextPath, text_to_path
+from matplotlib.font_manager import FontProperties, findfont, get_font
 
 
-def text_3d_mesh(text_geom, text_height):
+def text_3d_mesh(text_geom, text_height, pool=None):
     # Render the text geometry to an OpenSCAD string
     scad_code = scad_render(text_geom)
 
-    # Path for the OpenSCAD file
-    scad_path = os.path.join("/tmp/", 'text.scad')
+    # Convert it to a mesh in a private temporary directory, so concurrent
+    # calls do not overwrite each other's files
+    if pool is None:
+        text_mesh = render_scad(scad_code)
+    else:
+        text_mesh = pool.render(scad_code)
+    return _lift_text_mesh(text_mesh, text_height)
 
-    # Write the OpenSCAD string to a file
-    with open(scad_path, 'w') as f:
-        f.write(scad_code)
 
-    # Convert the OpenSCAD file to STL using OpenSCAD command line
-    stl_path_text = os.path.join("/tmp/", 'text.stl')
-    subprocess.run(['openscad', '-o', stl_path_text, scad_path])
+def text_3d_meshes(text_geoms, text_height, pool=None):
+    """
+    Render many text geometries concurrently on an OpenSCADPool.
 
-    # Load the text geometry from the generated STL file
-    text_mesh = trimesh.load_mesh(stl_path_text)
+    Parameters:
+    - text_geoms: Iterable of solid text geometries.
+    - text_height: Height of the extruded text.
+    - pool: OpenSCADPool to use, the shared default pool if None.
 
+    Returns:
+    - List of meshes in the order of text_geoms.
+    """
+    pool = pool or default_pool()
+    text_meshes = pool.render_many([scad_render(text_geom) for text_geom in text_geoms])
+    return [_lift_text_mesh(text_mesh, text_height) for text_mesh in text_meshes]
+
+
+def _lift_text_mesh(text_mesh, text_height):
     # Center the text on the board
-    text_bounds = text_mesh.bounding_box.extents
     text_translation = [
         0,
         0,
@@ -47,6 +64,78 @@ def multi_line_text(text_lines, line_spacing=10, size=10, height=5):
     return linear_extrude(height=height)(lines)
 
 
+@lru_cache(maxsize=None)
+def _glyph_mesh(font, size, height, char):
+    # Extruded outline of one character, with its origin at the pen position
+    if char.isspace():
+        return None
+    path = TextPath((0, 0), char, size=size, prop=FontProperties(family=font))
+    shape = None
+    for ring in path.to_polygons():
+        if len(ring) < 3:
+            continue
+        ring = Polygon(ring).buffer(0)
+        # Even-odd fill: nested outlines cut holes (the inside of an "o")
+        shape = ring if shape is None else shape.symmetric_difference(ring)
+    if shape is None or shape.is_empty:
+        return None
+
+    polygons = getattr(shape, "geoms", [shape])
+    meshes = [extrude_polygon(polygon, height=height) for polygon in polygons if polygon.area > 0]
+    mesh = trimesh.util.concatenate(meshes)
+    mesh.vertices.flags.writeable = False
+    return mesh
+
+
+def glyph_mesh(char, size, height, font="DejaVu Sans"):
+    """
+    Extruded mesh of a single character, cached per (font, size, height, char).
+
+    Returns a copy (or None for blank characters such as spaces).
+    """
+    mesh = _glyph_mesh(font, float(size), float(height), char)
+    return None if mesh is None else mesh.copy()
+
+
+def _pen_positions(text_string, size, font):
+    # x position of every character, with the font's advances and kerning
+    ft_font = get_font(findfont(FontProperties(family=font)))
+    ft_font.set_size(text_to_path.FONT_SCALE, text_to_path.DPI)
+    glyph_info, _, _ = text_to_path.get_glyphs_with_font(ft_font, text_string)
+    return [xposition * size / text_to_path.FONT_SCALE for _, xposition, _, _ in glyph_info]
+
+
+def glyph_text_mesh(text_string, size, height, font="DejaVu Sans"):
+    """
+    Render text into an extruded mesh in-process, without OpenSCAD.
+
+    Each character is extruded once and cached, so a string is assembled
+    by translating cached glyphs. Like text_3d, the text is centered in x
+    and y; it spans z from 0 to height.
+    """
+    size, height = float(size), float(height)
+    vertices, faces = [], []
+    offset = 0
+    for char, x in zip(text_string, _pen_positions(text_string, size, font)):
+        glyph = _glyph_mesh(font, size, height, char)
+        if glyph is None:
+            continue
+        vertices.append(glyph.vertices + [x, 0, 0])
+        faces.append(glyph.faces + offset)
+        offset += len(glyph.vertices)
+    if not vertices:
+        raise ValueError(f"Nothing to render in {text_string!r}")
+
+    text_mesh = trimesh.Trimesh(vertices=np.vstack(vertices), faces=np.vstack(faces), process=False)
+    center = text_mesh.bounds.mean(axis=0)
+    text_mesh.apply_translation([-center[0], -center[1], 0])
+    return text_mesh
+
+
+def glyph_cache_info():
+    return _glyph_mesh.cache_info()
+
+
 def center_mesh(mesh):
     # Get the bounding box
     bbox_min, bbox_max = mesh.bounds
@@ -59,39 +148,21 @@ def center_mesh(mesh):
     
     return mesh
 
-def curve_mesh_onto_cylinder(mesh, radius):
+def curve_mesh_onto_cylinder(mesh, radius, tolerance=None):
     mesh = center_mesh(mesh)
-    for vertex in mesh.vertices:
-        # Get the original x, y, z coordinates
-        x, y, z = vertex
+    # Convert y (linear distance) to an angular displacement around the cylinder
+    # and map the flat vertices onto the curved surface. With a tolerance, long
+    # edges are split first so they follow the curve within that distance.
+    if tolerance is not None:
+        return subdivide_for_deformer(mesh, curve_onto_cylinder, tolerance, radius=radius, axis=1)
+    return deform(mesh, curve_onto_cylinder, radius=radius, axis=1)
 
-        # Convert x (linear distance) to an angular displacement around the cylinder
-        angle = y / radius
 
-        # Map the flat vertex onto the curved surface
-        new_z = radius * np.cos(angle) + z*0.5
-
-        # Set the new vertex position
-        vertex[2] = new_z
-    
-    return mesh
-
-
-def curve_mesh_onto_cylinder_along_z(mesh, radius):
+def curve_mesh_onto_cylinder_along_z(mesh, radius, tolerance=None):
     mesh = center_mesh(mesh)
-    for vertex in mesh.vertices:
-        # Get the original x, y, z coordinates
-        x, y, z = vertex
-
-        # Convert x (linear distance) to an angular displacement around the cylinder
-        angle = x / radius
-
-        # Map the flat vertex onto the curved surface
-        new_x = radius * np.sin(angle) 
-        new_z = radius * np.cos(angle) + z*0.5
-
-        # Set the new vertex position
-        vertex[0] = new_x
-        vertex[2] = new_z
-    
-    return mesh
\ No newline at end of file
+    # Convert x (linear distance) to an angular displacement around the cylinder
+    # and map the flat vertices onto the curved surface. With a tolerance, long
+    # edges are split first so they follow the curve within that distance.
+    if tolerance is not None:
+        return subdivide_for_deformer(mesh, curve_onto_cylinder, tolerance, radius=radius, axis=0, move_axis=True)
+    return deform(mesh, curve_onto_cylinder, radius=radius, axis=0, move_axis=True)
@@ -4,6 +4,9 @@ import numpy as np
 import trimesh
 from shapely.geometry import Polygon
 
+from part_cache import cached_part
+from tessellation import get_tolerance, segments_for_radius, cylinder as tessellated_cylinder
+
 
 def validate_and_repair_mesh(mesh):
     """
@@ -40,86 +43,266 @@ def validate_and_repair_mesh(mesh):
     print(f"Is the mesh watertight after filling holes? {mesh.is_watertight}")
     return mesh
 
-def create_threaded_cylinder(radius, height, thread_thickness, thread_pitch):
+# Thread profiles as (s, h) breakpoints of a piecewise linear tooth, for
+# 0 <= s <= 0.5 in units of the pitch from the crest center, and h the height
+# as a fraction of the thread thickness. The tooth is mirrored for negative s.
+THREAD_PROFILES = {
+    # The original sweep: a triangle with the base as wide as the pitch
+    "triangle": [(0.0, 1.0), (0.5, 0.0)],
+    # ISO metric: crest flat of p/8 and root flat of p/4. The flanks are at
+    # 60 degrees only for the ISO depth, thread_thickness = 5 * sqrt(3) / 16 * pitch
+    # (about 0.541 pitch); other thicknesses make them steeper or flatter
+    "iso": [(0.0, 1.0), (1 / 16, 1.0), (3 / 8, 0.0), (0.5, 0.0)],
+    # Trapezoidal: flats of roughly 0.37 p at crest and root, with 30 degree
+    # flanks when thread_thickness = 0.5 * pitch
+    "trapezoidal": [(0.0, 1.0), (0.183, 1.0), (0.317, 0.0), (0.5, 0.0)],
+}
+
+# The solid core of the threaded cylinder is slightly larger than the thread root
+CORE_OFFSET = 0.1
+
+
+def _radius_table(radius, thread_thickness, profile):
     """
-    Create a threaded cylinder using trimesh, ensuring the mesh is watertight.
+    The surface radius max(radius + thread_thickness * h(s), radius + CORE_OFFSET)
+    as (s, r) breakpoints for 0 <= s <= 0.5, including the points where the
+    tooth meets the core. Interpolating between them is exact.
+    """
+    table = np.array(THREAD_PROFILES[profile] if isinstance(profile, str) else profile, dtype=float)
+    s, h = table[:, 0], table[:, 1]
+    core_fraction = CORE_OFFSET / thread_thickness
+    breakpoints = list(s)
+    for s0, s1, h0, h1 in zip(s[:-1], s[1:], h[:-1], h[1:]):
+        if (h0 - core_fraction) * (h1 - core_fraction) < 0:
+            breakpoints.append(s0 + (core_fraction - h0) * (s1 - s0) / (h1 - h0))
+    breakpoints = np.unique(breakpoints)
+    r = radius + thread_thickness * np.interp(breakpoints, s, h)
+    return np.column_stack((breakpoints, np.maximum(r, radius + CORE_OFFSET)))
+
+
+def _helix_columns(radius_tables, height, thread_pitch, sections):
+    """
+    Sample threaded surfaces along vertical columns around the axis.
+
+    The phase along each column follows the helix z = thread_pitch * theta / (2 pi)
+    and is evaluated once for all radius tables, so surfaces built from the
+    same call share their vertex layout.
 
     Parameters:
-    - radius: Radius of the base cylinder.
-    - height: Height of the cylinder.
-    - thread_thickness: Thickness of the thread.
-    - thread_pitch: The distance between each thread turn.
+    - radius_tables: List of (s, r) breakpoint tables, see _radius_table.
 
     Returns:
-    - A watertight trimesh mesh object representing the threaded cylinder.
+    - thetas: (sections,) column angles.
+    - column: (n,) column index of every sample, sorted.
+    - z: (n,) height of every sample. Every column starts at z = 0 and ends at
+      z = height.
+    - radii: List of (n,) radii, one per table.
     """
-    # Create the base cylinder
-    cylinder = trimesh.creation.cylinder(radius=radius+0.1, height=height, sections=64)
-
-    # Define the thread profile (triangle shape with angle pointing outwards)
-    # Rotate the triangle so that its point faces radially outwards
-    thread_profile = Polygon([
-        (0, -thread_pitch / 2),  # Base left
-        (0, thread_pitch / 2),   # Base right
-        (thread_thickness, 0)        # Tip of the triangle, pointing outwards
-    ])
-
-    # Calculate the number of turns the thread will make
-    num_turns = (height + thread_pitch/2) / thread_pitch
-
-    # Create the helical path for the thread
-    num_steps = int(num_turns * 100)  # Adjust resolution based on number of turns
-    t = np.linspace(0, num_turns * 2 * np.pi, num_steps)
-    x = (radius + thread_thickness / 3 * 0) * np.cos(t)
-    y = (radius + thread_thickness / 3 * 0) * np.sin(t)
-    z = (thread_pitch / (2 * np.pi)) * t
-    helix_points = np.column_stack((x, y, z))
-
-    # Sweep the thread profile along the helical path
-    thread_mesh = trimesh.creation.sweep_polygon(thread_profile, helix_points)
+    # Kinks of every table, mirrored to a full pitch
+    offsets = np.concatenate([table[:, 0] for table in radius_tables])
+    offsets = np.unique(np.concatenate((-offsets, offsets)))
+
+    # Kinks of every turn crossing each column, plus both ends
+    thetas = np.linspace(0, 2 * np.pi, sections, endpoint=False)
+    base = thread_pitch * thetas / (2 * np.pi)
+    turns = np.arange(-2, np.ceil(height / thread_pitch) + 2)
+    z = base[:, None] + thread_pitch * (turns[:, None] + offsets[None, :]).ravel()[None, :]
+    column = np.broadcast_to(np.arange(sections)[:, None], z.shape)
+    inside = (z > 0) & (z < height)
+    column = np.concatenate((np.arange(sections), np.arange(sections), column[inside]))
+    z = np.concatenate((np.zeros(sections), np.full(sections, height), z[inside]))
+
+    # Sort by column, then height, and drop repeated heights
+    order = np.lexsort((z, column))
+    column, z = column[order], z[order]
+    keep = np.ones(len(z), dtype=bool)
+    keep[1:] = (np.diff(z) > 0) | (np.diff(column) > 0)
+    column, z = column[keep], z[keep]
+
+    phase = np.abs(((z - base[column]) / thread_pitch + 0.5) % 1.0 - 0.5)
+    radii = [np.interp(phase, table[:, 0], table[:, 1]) for table in radius_tables]
+    return thetas, column, z, radii
+
+
+def _simplify_radii(points, tolerance):
+    """
+    Douglas-Peucker on (u, r) points with increasing u, measuring the error
+    in r only. The kept points are within tolerance of every dropped radius,
+    whatever the units of u.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    spans = [(0, len(points) - 1)]
+    while spans:
+        i, j = spans.pop()
+        if j - i < 2:
+            continue
+        chord = np.interp(points[i + 1:j, 0], points[[i, j], 0], points[[i, j], 1])
+        error = np.abs(points[i + 1:j, 1] - chord)
+        k = error.argmax()
+        if error[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            spans += [(i, k), (k, j)]
+    return points[keep]
+
+
+def _offset_radius_table(table, thread_pitch, clearance, samples=1024):
+    """
+    Offset a radius table outward by clearance along the surface normal.
 
-    # Trim the thread to match the cylinder's height
-    # top_plane_origin = [0, 0, height]
-    # bottom_plane_origin = [0, 0, 0]
-    # thread_mesh = thread_mesh.slice_plane(plane_origin=top_plane_origin, plane_normal=[0, 0, -1])
-    # thread_mesh = thread_mesh.slice_plane(plane_origin=bottom_plane_origin, plane_normal=[0, 0, 1])
+    In the axial section the result is the outline of the male tooth swept by
+    a disk of radius clearance (a Minkowski sum), so flanks, crest and root
+    all get the same gap. The outline is sampled densely and simplified so
+    that its radius stays within the tessellation tolerance of the offset.
+    """
+    # Sample half a pitch in mm, plus the neighbouring teeth the disk reaches
+    u = np.linspace(0, thread_pitch / 2, samples + 1)
+    dz = np.linspace(-clearance, clearance, 257)
+    phase = np.abs(((u[:, None] + dz[None, :]) / thread_pitch + 0.5) % 1.0 - 0.5)
+    r = np.interp(phase, table[:, 0], table[:, 1]) + np.sqrt(clearance ** 2 - dz ** 2)[None, :]
+    dense = np.column_stack((u / thread_pitch, r.max(axis=1)))
+    # Half the tolerance for simplifying, half for pushing back out below
+    simplified = _simplify_radii(dense, get_tolerance() / 2)
+
+    # Simplifying may cut into the offset, push it back out so the gap is kept
+    deficit = dense[:, 1] - np.interp(dense[:, 0], simplified[:, 0], simplified[:, 1])
+    simplified[:, 1] += max(deficit.max(), 0.0)
+    return simplified
+
+
+def thread_clearance(column, z, r_male, r_female):
+    """
+    Minimum gap between a male thread and its female cutout built on the same
+    columns, measured in the axial section of every column: the distance from
+    each male sample to the female outline in that column.
+    """
+    gaps = []
+    starts = np.searchsorted(column, np.arange(column[-1] + 2))
+    for start, end in zip(starts[:-1], starts[1:]):
+        male = np.column_stack((z[start:end], r_male[start:end]))
+        female = np.column_stack((z[start:end], r_female[start:end]))
+        # Leave out the end caps, where the cutout is not offset
+        male = male[(male[:, 0] > 0) & (male[:, 0] < z[end - 1])]
+        a, b = female[:-1], female[1:]
+        ab = b - a
+        t = np.einsum("mnk,nk->mn", male[:, None, :] - a[None], ab) / np.maximum((ab ** 2).sum(axis=1), 1e-12)
+        closest = a[None] + np.clip(t, 0, 1)[..., None] * ab[None]
+        gaps.append(np.linalg.norm(male[:, None, :] - closest, axis=2).min())
+    return float(min(gaps))
+
+
+def create_thread_pair(radius, height, thread_thickness, thread_pitch, clearance=0.2, profile="triangle", sections=None):
+    """
+    Create a male threaded cylinder and the matching female cutout.
 
-    cutting_box1 = trimesh.creation.box([radius * 10, radius * 10, height*2])
-    cutting_box1 = cutting_box1.apply_translation([0, 0, -height])
-    cutting_box2 = trimesh.creation.box([radius * 10, radius * 10, height*2])
-    cutting_box2 = cutting_box2.apply_translation([0, 0, height+height])
+    Both come from one evaluation of the helix on shared columns. The cutout
+    is the male thread grown by clearance along the surface normal, not just
+    along the radius, so the flanks get the same gap as the crest.
 
-    # cutting_box1.show()
+    Parameters:
+    - radius, height, thread_thickness, thread_pitch, profile: As for
+      create_threaded_cylinder.
+    - clearance: Gap between the male and female threads in mm.
+    - sections: Number of columns around the axis, from the tessellation
+      tolerance if None.
 
-    # Ensure both meshes are watertight before boolean operation
-    cylinder.apply_translation([0, 0, height/2])
-    cylinder.merge_vertices()
-    thread_mesh.merge_vertices()
+    Returns:
+    - (male, female, min_gap): Two watertight meshes and the smallest gap
+      between them found by thread_clearance.
+    """
+    if sections is None:
+        sections = segments_for_radius(radius + thread_thickness + clearance)
+    male_table = _radius_table(radius, thread_thickness, profile)
+    female_table = _offset_radius_table(male_table, thread_pitch, clearance)
+    thetas, column, z, (r_male, r_female) = _helix_columns([male_table, female_table], height, thread_pitch, sections)
 
-    # print(thread_mesh.is_watertight)
-    # print(cylinder.is_watertight)
+    male = _columns_to_mesh(thetas, column, z, r_male, height)
+    female = _columns_to_mesh(thetas, column, z, r_female, height)
+    min_gap = thread_clearance(column, z, r_male, r_female)
+    return male, female, min_gap
 
-    # Perform boolean union to create a single, watertight mesh
-    threaded_cylinder = trimesh.boolean.union([cylinder, thread_mesh])
-    # threaded_cylinder = validate_and_repair_mesh(threaded_cylinder)
-    # threaded_cylinder.show()
-    # threaded_cylinder.remove_degenerate_faces()
 
-    # print(threaded_cylinder.is_watertight)
+def _columns_to_mesh(thetas, column, z, r, height):
+    """
+    Close the column samples of a surface of revolution into a watertight mesh,
+    with fans to the axis for the end caps.
 
-    threaded_cylinder = threaded_cylinder.difference(cutting_box2)
-    # threaded_cylinder.show()
-    threaded_cylinder = threaded_cylinder.difference(cutting_box1)
+    The strip between neighbouring columns is triangulated by walking up both
+    columns at once, always advancing in the one whose next sample is lower.
+    """
+    sections = len(thetas)
+    counts = np.bincount(column, minlength=sections)
+    starts = np.concatenate(([0], np.cumsum(counts)))
+    row = np.arange(len(z)) - starts[column]
+
+    # Every sample above the bottom is a step in the strip to its right (as
+    # the left column a) and in the strip to its left (as the right column b)
+    upper = row > 0
+    strip = np.concatenate((column[upper], (column[upper] - 1) % sections))
+    events = np.concatenate((z[upper], z[upper]))
+    from_b = np.concatenate((np.zeros(upper.sum(), dtype=bool), np.ones(upper.sum(), dtype=bool)))
+    order = np.lexsort((from_b, events, strip))
+    strip, from_b = strip[order], from_b[order]
+
+    # Rows in a and b before every step, counted within each strip
+    strip_start = np.searchsorted(strip, np.arange(sections))
+    a_steps = np.cumsum(~from_b) - (~from_b)
+    b_steps = np.cumsum(from_b) - from_b
+    i = a_steps - a_steps[strip_start][strip]
+    j = b_steps - b_steps[strip_start][strip]
+    a_ids = starts[strip] + i
+    b_ids = starts[(strip + 1) % sections] + j
+
+    # a is to the left of b seen from outside, triangles are counter-clockwise
+    side = np.where(
+        from_b[:, None],
+        np.column_stack((a_ids, b_ids, b_ids + 1)),
+        np.column_stack((a_ids, b_ids, a_ids + 1)),
+    )
+
+    angle = thetas[column]
+    vertices = np.column_stack((r * np.cos(angle), r * np.sin(angle), z))
+    bottom_center, top_center = len(vertices), len(vertices) + 1
+    vertices = np.vstack((vertices, [[0, 0, 0], [0, 0, height]]))
+
+    bottom = starts[:-1]
+    top = starts[1:] - 1
+    faces = np.vstack((
+        side,
+        np.column_stack((np.full(sections, bottom_center), np.roll(bottom, -1), bottom)),
+        np.column_stack((np.full(sections, top_center), top, np.roll(top, -1))),
+    ))
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+
+@cached_part
+def create_threaded_cylinder(radius, height, thread_thickness, thread_pitch, profile="triangle", sections=None):
+    """
+    Create a threaded cylinder using trimesh, ensuring the mesh is watertight.
 
-    # threaded_cylinder.show()
+    The surface is evaluated directly from the thread profile on a grid of
+    columns around the axis, so no sweep or booleans are needed and the mesh
+    is watertight by construction.
 
-    # Check if the resulting mesh is watertight
-    if not threaded_cylinder.is_watertight:
-        print("Warning: The resulting mesh is not watertight.")
-    else:
-        print("Success: The resulting mesh is watertight.")
+    Parameters:
+    - radius: Radius of the base cylinder.
+    - height: Height of the cylinder.
+    - thread_thickness: Thickness of the thread.
+    - thread_pitch: The distance between each thread turn.
+    - profile: "triangle", "iso" or "trapezoidal", see THREAD_PROFILES, or a
+      list of (s, h) breakpoints.
+    - sections: Number of columns around the axis, from the tessellation
+      tolerance if None.
 
-    return threaded_cylinder
+    Returns:
+    - A watertight trimesh mesh object representing the threaded cylinder.
+    """
+    if sections is None:
+        sections = segments_for_radius(radius + thread_thickness)
+    table = _radius_table(radius, thread_thickness, profile)
+    thetas, column, z, (r,) = _helix_columns([table], height, thread_pitch, sections)
+    return _columns_to_mesh(thetas, column, z, r, height)
 
 def flip_z(mesh):
     flip_z_matrix = np.array([
@@ -146,10 +329,12 @@ if __name__ == "__main__":
     thread_thickness = 1.5  # Thickness of the thread
     thread_pitch = 2      # Distance between thread peaks
 
-    # Create the threaded cylinder
-    threaded_cylinder = create_threaded_cylinder(radius, height, thread_thickness, thread_pitch)
+    clearance = 0.5         # Gap between the male and female threads
+
+    # Create the threaded cylinder and its cutout
+    threaded_cylinder, threaded_cylinder_cutout, min_gap = create_thread_pair(radius, height, thread_thickness, thread_pitch, clearance=clearance)
+    print(f"Thread clearance: {min_gap:.3f} mm minimum, {clearance:.3f} mm requested")
     threaded_cylinder = flip_z(threaded_cylinder)
-    threaded_cylinder_cutout = create_threaded_cylinder(radius+0.5, height, thread_thickness, thread_pitch)
     threaded_cylinder_cutout = flip_z(threaded_cylinder_cutout)
 
     # Visualize the mesh (requires pyglet or other 3D viewer support)
@@ -158,7 +343,7 @@ if __name__ == "__main__":
     # case = case_mesh.difference(threaded_cylinder)
     # case.show()
 
-    cylinder = trimesh.creation.cylinder(radius=radius * 1.3, height=height, sections=64)
+    cylinder = tessellated_cylinder(radius=radius * 1.3, height=height)
     cylinder = cylinder.apply_translation([0, 0, height/2])
     cylinder = cylinder.difference(threaded_cylinder_cutout)
     # cylinder.show()
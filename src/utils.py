@@ -1,5 +1,13 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
 import trimesh
 import numpy as np
+import shapely
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from shapely.strtree import STRtree
 
 def slice_plane_x(mesh, x_coordinate, side="left"):
     big_box = trimesh.creation.box(mesh.bounding_box.extents)
@@ -61,4 +69,204 @@ def scale_mesh(mesh, factor):
 
     # Apply the scaling matrix to the mesh
     mesh.apply_transform(scaling_matrix)    
-    return mesh
\ No newline at end of file
+    return mesh
+
+
+def _bounds_overlap(bounds_a, bounds_b):
+    # Axis-aligned bounding boxes, as (2, 3) arrays of min and max corners
+    return bool(np.all(bounds_a[0] <= bounds_b[1]) and np.all(bounds_b[0] <= bounds_a[1]))
+
+
+def overlapping_groups(meshes):
+    """
+    Split meshes into groups whose bounding boxes overlap, directly or
+    through other meshes of the group. Meshes of different groups are
+    disjoint, so a union of groups can be replaced by concatenating them.
+
+    Returns:
+        list of lists of indices into meshes.
+    """
+    bounds = np.array([mesh.bounds for mesh in meshes]).reshape(-1, 2, 3)
+    # Boxes overlapping in xy from an R-tree of their footprints, then in z
+    footprints = shapely.box(bounds[:, 0, 0], bounds[:, 0, 1], bounds[:, 1, 0], bounds[:, 1, 1])
+    first, second = STRtree(footprints).query(footprints)
+    touching = (bounds[first, 0, 2] <= bounds[second, 1, 2]) & (bounds[second, 0, 2] <= bounds[first, 1, 2])
+    first, second = first[touching], second[touching]
+
+    # Connected components of the overlap graph
+    count = len(bounds)
+    graph = coo_matrix((np.ones(len(first), dtype=bool), (first, second)), shape=(count, count))
+    _, labels = connected_components(graph, directed=False)
+    order = np.argsort(labels, kind="stable")
+    groups = np.split(order, np.flatnonzero(np.diff(labels[order])) + 1) if count else []
+    return sorted((group.tolist() for group in groups), key=lambda group: group[0])
+
+
+def _merge_groups(meshes, engine=None):
+    # One n-ary union per group of overlapping meshes, then concatenate the disjoint results
+    merged = []
+    for group in overlapping_groups(meshes):
+        if len(group) == 1:
+            merged.append(meshes[group[0]])
+        else:
+            merged.append(trimesh.boolean.union([meshes[i] for i in group], engine=engine))
+    return merged[0] if len(merged) == 1 else trimesh.util.concatenate(merged)
+
+
+def batch_union(meshes, engine=None):
+    """
+    Union many meshes with as few boolean calls as possible: overlapping
+    meshes are united per group, and groups that don't touch are simply
+    concatenated.
+
+    Returns:
+        (trimesh.Trimesh, dict): The union and the seconds spent.
+    """
+    start = time.time()
+    result = _merge_groups(list(meshes), engine)
+    elapsed = time.time() - start
+    return result, {"merge": elapsed, "total": elapsed}
+
+
+def _spatial_chunks(indices, centers, size):
+    # Split along the longest extent of the centers until every chunk holds at most size meshes
+    if len(indices) <= size:
+        return [indices]
+    axis = np.ptp(centers[indices], axis=0).argmax()
+    order = indices[np.argsort(centers[indices, axis], kind="stable")]
+    half = len(order) // 2
+    return _spatial_chunks(order[:half], centers, size) + _spatial_chunks(order[half:], centers, size)
+
+
+def _union_arrays(parts, engine=None):
+    # Runs in a worker process: meshes travel as (vertices, faces) arrays
+    meshes = [trimesh.Trimesh(vertices=vertices, faces=faces, process=False) for vertices, faces in parts]
+    result = trimesh.boolean.union(meshes, engine=engine)
+    return np.asarray(result.vertices), np.asarray(result.faces)
+
+
+def _concatenate_arrays(parts):
+    offsets = np.cumsum([0] + [len(vertices) for vertices, _ in parts[:-1]])
+    vertices = np.vstack([vertices for vertices, _ in parts])
+    faces = np.vstack([faces + offset for (_, faces), offset in zip(parts, offsets)])
+    return vertices, faces
+
+
+def _arrays_overlap(part_a, part_b):
+    bounds_a = np.array([part_a[0].min(axis=0), part_a[0].max(axis=0)])
+    bounds_b = np.array([part_b[0].min(axis=0), part_b[0].max(axis=0)])
+    return _bounds_overlap(bounds_a, bounds_b)
+
+
+def parallel_union(meshes, max_workers=None, group_size=None, engine=None):
+    """
+    Union many meshes across a process pool.
+
+    Meshes whose bounding boxes don't overlap, directly or through others,
+    are concatenated. Every group of overlapping meshes is split into
+    spatially coherent chunks, the chunks are united in worker processes and
+    the partial results are merged pairwise in a balanced tree, concatenating
+    pairs that turn out not to touch.
+
+    Parameters:
+        meshes (list of trimesh.Trimesh): The operands.
+        max_workers (int): Worker processes, all CPUs if None.
+        group_size (int): Meshes per chunk, spread over the workers if None.
+        engine (str): Boolean engine, the trimesh default if None.
+
+    Returns:
+        (trimesh.Trimesh, dict): The union and the seconds spent per step
+        ("grouping", "chunks", "merge" and "total").
+    """
+    timings = {}
+    start = time.time()
+    meshes = list(meshes)
+    if not meshes:
+        raise ValueError("Nothing to union")
+    max_workers = max_workers or os.cpu_count() or 1
+    centers = np.array([mesh.bounds.mean(axis=0) for mesh in meshes]).reshape(-1, 3)
+
+    # Leaves of the reduction: chunks of neighbouring meshes within each overlapping group
+    components = []
+    for group in overlapping_groups(meshes):
+        size = group_size or max(2, int(np.ceil(len(group) / max_workers)))
+        components.append([
+            [(np.asarray(meshes[i].vertices), np.asarray(meshes[i].faces)) for i in chunk]
+            for chunk in _spatial_chunks(np.array(group), centers, size)
+        ])
+    timings["grouping"] = time.time() - start
+
+    def run(executor, jobs):
+        # One result per job, with only the booleans sent to the pool
+        results = []
+        for parts in jobs:
+            if len(parts) == 1:
+                results.append(parts[0])
+            elif len(parts) == 2 and not _arrays_overlap(*parts):
+                results.append(_concatenate_arrays(parts))
+            else:
+                results.append(executor.submit(_union_arrays, parts, engine))
+        return [result.result() if isinstance(result, Future) else result for result in results]
+
+    executor = None
+    if any(len(chunks) > 1 or len(chunks[0]) > 1 for chunks in components):
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        step = time.time()
+        # Union every chunk, all groups at once
+        jobs = [chunk for chunks in components for chunk in chunks]
+        results = iter(run(executor, jobs)) if jobs else iter([])
+        components = [[next(results) for _ in chunks] for chunks in components]
+        timings["chunks"] = time.time() - step
+
+        step = time.time()
+        # Merge neighbouring partial results pairwise until one is left per group
+        while any(len(parts) > 1 for parts in components):
+            pairs = [[parts[i:i + 2] for i in range(0, len(parts), 2)] for parts in components]
+            results = iter(run(executor, [pair for level in pairs for pair in level]))
+            components = [[next(results) for _ in level] for level in pairs]
+        timings["merge"] = time.time() - step
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Separate groups don't touch each other
+    vertices, faces = _concatenate_arrays([parts[0] for parts in components])
+    result = trimesh.Trimesh(vertices=vertices, faces=faces)
+    timings["total"] = time.time() - start
+    return result, timings
+
+
+def batch_difference(target, cutters, engine=None):
+    """
+    Subtract many cutters from a target in one boolean call.
+
+    Cutters that don't reach the bounding box of the target are dropped,
+    and the target and all remaining cutters go to the engine together,
+    overlapping or not.
+
+    Parameters:
+        target (trimesh.Trimesh): The part to cut.
+        cutters (list of trimesh.Trimesh): Tools to subtract from it.
+        engine (str): Boolean engine, the trimesh default if None.
+
+    Returns:
+        (trimesh.Trimesh, dict): The cut part and the seconds spent per step
+        ("prune", "boolean" and "total").
+    """
+    timings = {}
+    start = time.time()
+    cutters = [cutter for cutter in cutters if _bounds_overlap(target.bounds, cutter.bounds)]
+    timings["prune"] = time.time() - start
+
+    step = time.time()
+    result = trimesh.boolean.difference([target, *cutters], engine=engine) if cutters else target.copy()
+    timings["boolean"] = time.time() - step
+    timings["total"] = time.time() - start
+    return result, timings
+
+
+def print_timings(name, timings):
+    # One line per batched boolean, e.g. "pan: prune 0.000 s, boolean 0.104 s, total 0.104 s"
+    steps = ", ".join(f"{step} {seconds:.3f} s" for step, seconds in timings.items())
+    print(f"{name}: {steps}")
@@ -1,5 +1,6 @@
 import trimesh
 import numpy as np
+import tessellation
 
 def stable_joint(box_l, box_w, box_h, notch_base, notch_top, notch_height, stick_radius):
     box1 = trimesh.creation.box(box_l, box_w, box_h)
@@ -83,7 +84,7 @@ def stable_joint(box_l, box_w, box_h, notch_base, notch_top, notch_height, stick
     female = box2.difference(notch_cut)
     # female.show()
 
-    stick = trimesh.creation.cylinder(radius=stick_radius, height=box_w, sections=64)
+    stick = tessellation.cylinder(radius=stick_radius, height=box_w)
     rotation_matrix = trimesh.transformations.rotation_matrix(
         np.radians(90),  # Angle in radians
         [1, 0, 0]        # Rotation axis (x-axis)
@@ -92,7 +93,7 @@ def stable_joint(box_l, box_w, box_h, notch_base, notch_top, notch_height, stick
     stick.apply_transform(rotation_matrix)       
     stick = stick.apply_translation([notch_height/2,0,box_h/2])
     
-    stick_cut = trimesh.creation.cylinder(radius=stick_radius + wiggle_room/4, height=box_w, sections=64)
+    stick_cut = tessellation.cylinder(radius=stick_radius + wiggle_room/4, height=box_w)
     rotation_matrix = trimesh.transformations.rotation_matrix(
         np.radians(90),  # Angle in radians
         [1, 0, 0]        # Rotation axis (x-axis)